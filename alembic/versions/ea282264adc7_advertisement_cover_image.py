@@ -0,0 +1,36 @@
+"""advertisement cover image
+
+Revision ID: ea282264adc7
+Revises: 62ceb4658453
+Create Date: 2026-10-17 11:26:50.834113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ea282264adc7'
+down_revision: Union[str, None] = '62ceb4658453'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('advertisement_images', sa.Column('position', sa.Integer(), server_default='0', nullable=False))
+    # Number the existing images in insertion order, the first one becomes the cover image
+    op.execute(
+        "UPDATE advertisement_images SET position = numbered.row_number - 1 "
+        "FROM (SELECT id, row_number() OVER (PARTITION BY advertisement_id ORDER BY id) AS row_number "
+        "FROM advertisement_images) AS numbered "
+        "WHERE advertisement_images.id = numbered.id"
+    )
+    op.alter_column('advertisement_images', 'position', server_default=None)
+    op.create_index('ix_advertisement_images_cover', 'advertisement_images', ['advertisement_id'], unique=True, postgresql_where=sa.text('position = 0'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_advertisement_images_cover', table_name='advertisement_images', postgresql_where=sa.text('position = 0'))
+    op.drop_column('advertisement_images', 'position')
@@ -1,8 +1,9 @@
 from typing import Annotated, Literal
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, AsyncEngine
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
 from fastapi import APIRouter, status, Query, Depends
 
-from src.database import get_session, get_engine
+from src.database import get_session, get_engine, get_redis
 from src.pagination import PaginatedResponse, PaginationQuerySchema, pagination_query
 from src.admin import schemas
 from src.admin import service
@@ -21,7 +22,7 @@ router = APIRouter()
 async def create_category(
     payload: schemas.Category,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)]
 ) -> schemas.Category:
     await service.add_category(session=session, payload=payload)
     return payload
@@ -34,7 +35,7 @@ async def create_category(
 )
 async def search_category_by_name(
     category_name: str,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)]
 ):
     result = await service.search_category_by_name(session=session, category_name=category_name)
     return result
@@ -63,7 +64,7 @@ async def list_categories(
 async def delete_category_by_slug(
     category_id: CategoryId,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     await service.delete_category_by_id(session=session, category_id=category_id)
 
@@ -76,7 +77,7 @@ async def delete_category_by_slug(
 async def get_category_by_id(
     category_id: CategoryId,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     result = (await service.get_category_by_id(session=session, category_id=category_id))._asdict()
     return {"name":result["name"], "parent_category_name":result["parent_name"]}
@@ -89,7 +90,7 @@ async def update_category_by_id(
     category_id: CategoryId,
     payload: schemas.UpdateCategoryIn,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)]
 ):
     await service.update_category_by_id(
         session=session, category_id=category_id, payload=payload
@@ -103,6 +104,7 @@ async def update_category_by_id(
 )
 async def get_all_advertisement(
     engine: Annotated[AsyncEngine, Depends(get_engine)],
+    redis: Annotated[Redis, Depends(get_redis)],
     pagination_info: Annotated[PaginationQuerySchema, Depends(pagination_query)],
     is_admin: Annotated[Literal[True], Depends(is_admin)],
     phone_number: Annotated[PhoneNumber | None, Query(alias="phoneNumber")] = None,
@@ -110,8 +112,9 @@ async def get_all_advertisement(
     is_deleted: Annotated[bool | None, Query(alias="isDeleted")] = None,
 ):
     response = await service.get_all_advertisement(
-        engine=engine, limit=pagination_info.limit,
-        offset=pagination_info.offset, phone_number=phone_number,
+        engine=engine, redis=redis, limit=pagination_info.limit,
+        offset=pagination_info.offset, cursor=pagination_info.cursor,
+        count_strategy=pagination_info.count_strategy, phone_number=phone_number,
         published=published, is_deleted=is_deleted
     )
     return response
@@ -124,7 +127,7 @@ async def get_all_advertisement(
 async def publish_advertisement(
     advertisement_id: AdvertisementId,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     await service.publish_advertisement(session=session, advertisement_id=advertisement_id)
 
@@ -136,7 +139,7 @@ async def publish_advertisement(
 async def unpublish_advertisement(
     advertisement_id: AdvertisementId,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     await service.unpublish_advertisement(session=session, advertisement_id=advertisement_id)
 
@@ -149,7 +152,7 @@ async def advertisement_comment(
     payload: schemas.AdvertisementComment,
     advertisement_id: AdvertisementId,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ) -> None:
     await service.advertisement_comment(
         session=session, advertisement_id=advertisement_id, comment=payload.admin_comment
@@ -163,9 +166,10 @@ async def advertisement_comment(
 async def delete_advertisement(
     advertisement_id: AdvertisementId,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ):
-    await service.delete_advertisement(session=session, advertisement_id=advertisement_id)
+    await service.delete_advertisement(session=session, redis=redis, advertisement_id=advertisement_id)
 
 
 @router.get(
@@ -176,7 +180,7 @@ async def delete_advertisement(
 async def get_advertisement(
     advertisement_id: AdvertisementId,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ):
     result = await service.get_advertisement(
         session=session, advertisement_id=advertisement_id
@@ -191,9 +195,10 @@ async def get_advertisement(
 async def ban_user(
     phone_number: PhoneNumber,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> dict:
-    await service.ban_user(phone_number=phone_number, session=session)
+    await service.ban_user(phone_number=phone_number, session=session, redis=redis)
     return {"detail": "User banned successfully."}
 
 
@@ -204,7 +209,8 @@ async def ban_user(
 async def cancel_ban_user(
     phone_number: PhoneNumber,
     is_admin: Annotated[Literal[True], Depends(is_admin)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> dict:
-    await service.cancel_ban_user(phone_number=phone_number, session=session)
+    await service.cancel_ban_user(phone_number=phone_number, session=session, redis=redis)
     return {"detail": "User ban status is set to False."}
@@ -1,61 +1,71 @@
 import sqlalchemy as sa
 import sqlalchemy.orm as so
 
+from redis.asyncio import Redis
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, AsyncEngine
+from asyncpg.exceptions import ForeignKeyViolationError
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
 
-from src.pagination import paginate
+from src.events import publish
+from src.pagination import paginate, CountStrategy
 from src.admin import schemas
 from src.admin import exceptions
+from src.advertisement import events
 from src.advertisement.types import CategoryId, AdvertisementId
-from src.advertisement.models import Category, Advertisement, AdvertisementImage, Calendar
+from src.advertisement.models import Category, Advertisement, AdvertisementImage
 from src.advertisement.exceptions import AdvertisementNotFound
+from src.advertisement.utils import image_urls_column, image_variants_column, ranges_to_days
 from src.auth.models import User
 from src.auth.exceptions import UserNotFound
 from src.auth.types import PhoneNumber, UserId
-from src.s3.utils import delete_from_s3
+from src.auth.cache import invalidate_user_state
+from src.advertisement.media import enqueue_orphan_media, image_keys
+
+
+def _category_integrity_error(error: IntegrityError) -> Exception:
+    # The parent was deleted before the write, otherwise the name is taken
+    if getattr(error.orig, "sqlstate", None) == ForeignKeyViolationError.sqlstate:
+        return exceptions.InvalidParentCategoryName()
+    return exceptions.DuplicateCategoryName()
+
+
+async def _parent_category_id(session: AsyncSession, parent_category_name: str) -> CategoryId:
+    """
+    Locks the parent category so it isn't deleted before the transaction ends.
+    """
+    query = sa.select(Category.id).where(Category.name==parent_category_name).with_for_update(read=True)
+    parent_category_id: CategoryId | None = await session.scalar(query)
+    if parent_category_id is None:
+        raise exceptions.InvalidParentCategoryName
+    return parent_category_id
 
 
 async def add_category(
-        session: async_sessionmaker[AsyncSession], payload: schemas.Category
+        session: AsyncSession, payload: schemas.Category
 ) -> None:
-    if payload.parent_category_name:
-        parent_query = sa.select(Category).where(Category.name==payload.parent_category_name)
-        async with session.begin() as conn:
-            parent_category: Category | None = await conn.scalar(parent_query)
-            if parent_category is None:
-                raise exceptions.InvalidParentCategoryName
+    try:
+        async with session.begin():
+            parent_category_id = None
+            if payload.parent_category_name:
+                parent_category_id = await _parent_category_id(session, payload.parent_category_name)
             query = sa.insert(Category).values(
                 {
                     Category.name: payload.name,
-                    Category.parent_category: parent_category.id
+                    Category.parent_category: parent_category_id
                 }
             )
-            try:
-                async with session.begin() as conn:
-                    await conn.scalars(query)
-            except IntegrityError:
-                raise exceptions.DuplicateCategoryName
-    else:
-        without_parent_query = sa.insert(Category).values(
-            {
-                Category.name: payload.name,
-            }
-        )
-        try:
-            async with session.begin() as conn:
-                await conn.execute(without_parent_query)
-        except IntegrityError:
-            raise exceptions.DuplicateCategoryName
-        
+            await session.execute(query)
+    except IntegrityError as error:
+        raise _category_integrity_error(error)
+    await publish(events.CategoryChanged(None))
 
 
 async def search_category_by_name(
-        session: async_sessionmaker[AsyncSession], category_name: str
+        session: AsyncSession, category_name: str
 ) -> list[str]:
     query = sa.select(Category).where(Category.name.ilike(f"%{category_name}%"))
-    async with session.begin() as conn:
-        result = (await conn.scalars(query)).all()
+    async with session.begin():
+        result = (await session.scalars(query)).all()
     return [cat.name for cat in result]
 
 
@@ -71,21 +81,22 @@ async def all_categories(engine: AsyncEngine, limit: int, offset: int):
 
 
 async def delete_category_by_id(
-        session: async_sessionmaker[AsyncSession], category_id: CategoryId
+        session: AsyncSession, category_id: CategoryId
 ) -> None:
     query = sa.delete(Category).where(Category.id==category_id).returning(Category.id)
     try:
-        async with session.begin() as conn:
-            result = (await conn.scalar(query))
+        async with session.begin():
+            result = (await session.scalar(query))
         if result is None:
             raise exceptions.CategoryNotFound
     except IntegrityError as ex:
         print(ex)
         raise exceptions.CannotDeleteParentCategory
+    await publish(events.CategoryChanged(category_id))
 
 
 async def get_category_by_id(
-        session: async_sessionmaker[AsyncSession], category_id: CategoryId
+        session: AsyncSession, category_id: CategoryId
 ) -> sa.Row[tuple[str, str]]:
     parent_category_table_name = so.aliased(Category)
     parent_category_name = (parent_category_table_name.name).label("parent_name")
@@ -95,74 +106,85 @@ async def get_category_by_id(
         .select_from(Category)
         .join(parent_category_table_name, Category.parent_category==parent_category_table_name.id, isouter=True)
     )
-    async with session.begin() as conn:
-        result = (await conn.execute(query)).first()
+    async with session.begin():
+        result = (await session.execute(query)).first()
     if result is None:
         raise exceptions.CategoryNotFound
     return result
 
 
 async def update_category_by_id(
-        session: async_sessionmaker[AsyncSession],
-        category_id: CategoryId, payload: schemas.UpdateCategoryIn
+        session: AsyncSession, category_id: CategoryId, payload: schemas.UpdateCategoryIn
 ):
-    if payload.parent_category_name:
-        parent_query = sa.select(Category.id).where(Category.name==payload.parent_category_name)
-        async with session.begin() as conn:
-            result: CategoryId | None = await conn.scalar(parent_query)
-        if result is None:
-            raise exceptions.InvalidParentCategoryName
-    updated_query = sa.update(Category).where(Category.id==category_id).values(
-        {
-            Category.name: payload.name,
-            Category.parent_category: result if payload.parent_category_name else None
-        }
-    ).returning(Category.id)
     try:
-        async with session.begin() as conn:
-            updated_result: CategoryId | None = await conn.scalar(updated_query)
-        if updated_result is None:
-            raise exceptions.CategoryNotFound
-    except IntegrityError:
-        raise exceptions.DuplicateCategoryName
+        async with session.begin():
+            parent_category_id: CategoryId | None = None
+            if payload.parent_category_name:
+                # Concurrent moves could each pass the check and form a cycle together,
+                # this lock only waits for other category writes, not for readers
+                await session.execute(sa.text(f"LOCK TABLE {Category.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+                parent_category_id = await _parent_category_id(session, payload.parent_category_name)
+                # A category can't be moved under itself or one of its subcategories
+                ancestors = sa.select(Category.id, Category.parent_category).where(
+                    Category.id==parent_category_id
+                ).cte("ancestors", recursive=True)
+                ancestors = ancestors.union(
+                    sa.select(Category.id, Category.parent_category).join(
+                        ancestors, Category.id==ancestors.c.parent_category
+                    )
+                )
+                if await session.scalar(sa.select(sa.exists().where(ancestors.c.id==category_id))):
+                    raise exceptions.InvalidParentCategoryName
+            updated_query = sa.update(Category).where(Category.id==category_id).values(
+                {
+                    Category.name: payload.name,
+                    Category.parent_category: parent_category_id
+                }
+            ).returning(Category.id)
+            updated_result: CategoryId | None = await session.scalar(updated_query)
+            if updated_result is None:
+                raise exceptions.CategoryNotFound
+    except IntegrityError as error:
+        raise _category_integrity_error(error)
+    await publish(events.CategoryChanged(category_id))
 
 
 async def publish_advertisement(
         advertisement_id: AdvertisementId,
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession,
 ):
     query = sa.update(Advertisement).where(Advertisement.id==advertisement_id).values(
         {
             Advertisement.published: True
         }
     )
-    async with session.begin() as conn:
-        await conn.execute(query)
+    async with session.begin():
+        await session.execute(query)
+    await publish(events.AdvertisementPublished(advertisement_id))
 
 
 async def unpublish_advertisement(
         advertisement_id: AdvertisementId,
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession,
 ):
     query = sa.update(Advertisement).where(Advertisement.id==advertisement_id).values(
         {
             Advertisement.published: False
         }
     )
-    async with session.begin() as conn:
-        await conn.execute(query)
+    async with session.begin():
+        await session.execute(query)
+    await publish(events.AdvertisementUnpublished(advertisement_id))
 
 
 async def get_all_advertisement(
-        engine: AsyncEngine, limit: int, offset: int,
-        phone_number: PhoneNumber | None,
+        engine: AsyncEngine, redis: Redis, limit: int, offset: int, cursor: str | None,
+        count_strategy: CountStrategy, phone_number: PhoneNumber | None,
         published: bool | None, is_deleted: bool | None
 ) -> dict:
     query = sa.select(
         Advertisement.id, Advertisement.published, Advertisement.is_deleted, User.phone_number, User.is_banned
-    ).select_from(Advertisement).join(User, Advertisement.user_id==User.id).order_by(
-        Advertisement.published, Advertisement.is_deleted.desc()
-    ).order_by(Advertisement.created_at.desc())
+    ).select_from(Advertisement).join(User, Advertisement.user_id==User.id)
     if phone_number:
         query = query.where(User.phone_number==phone_number)
     if published or published is False:
@@ -170,45 +192,47 @@ async def get_all_advertisement(
     if is_deleted or is_deleted is False:
         query = query.where(Advertisement.is_deleted==is_deleted)
 
-    return await paginate(engine=engine, query=query, limit=limit, offset=offset)
+    return await paginate(
+        engine=engine, query=query, limit=limit, offset=offset, cursor=cursor,
+        keyset=(
+            Advertisement.published.asc(), Advertisement.is_deleted.desc(),
+            Advertisement.created_at.desc(), Advertisement.id.desc()
+        ),
+        count_strategy=count_strategy, redis=redis
+    )
 
 
 async def delete_advertisement(
         advertisement_id: AdvertisementId,
-        session: async_sessionmaker[AsyncSession]
+        session: AsyncSession, redis: Redis
 ):
     query = sa.delete(Advertisement).where(Advertisement.id==advertisement_id).returning(
         Advertisement.video
     )
-    image_query = sa.select(AdvertisementImage.url).where(
+    image_query = sa.select(AdvertisementImage.url, AdvertisementImage.variants).where(
         AdvertisementImage.advertisement_id==advertisement_id
     )
-    async with session.begin() as conn:
-        image_names: list[str] = list((await conn.scalars(image_query)).all())
-        video_name: str | None = await conn.scalar(query)
-        print(video_name)
-        print(image_names)
+    async with session.begin():
+        images = (await session.execute(image_query)).all()
+        video_name: str | None = await session.scalar(query)
 
-    if video_name:
-        await delete_from_s3(video_name)
-
-    for image_name in image_names:
-        await delete_from_s3(image_name)
+    # Files are deleted in the background by the media collector
+    keys = [key for image in images for key in image_keys(image.url, image.variants)]
+    await enqueue_orphan_media(redis=redis, keys=keys + ([video_name] if video_name else []))
+    await publish(events.AdvertisementDeleted(advertisement_id))
 
 
 async def get_advertisement(
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession,
         advertisement_id: AdvertisementId
 ) -> dict:
     query = sa.select(
         Advertisement.id, Advertisement.title, Advertisement.description, Advertisement.admin_comment,
         Advertisement.video, Advertisement.place, Advertisement.hour_price, Advertisement.day_price,
         Advertisement.week_price, Advertisement.month_price, Advertisement.published, Advertisement.lat_lon,
-        Advertisement.is_deleted, AdvertisementImage.url, User.phone_number,
-        Calendar.day, Category.name.label("category_name")
+        Advertisement.is_deleted, User.phone_number, Category.name.label("category_name"),
+        image_urls_column(), image_variants_column(), Advertisement.available_days
     ).select_from(Advertisement).join(
-        AdvertisementImage, Advertisement.id==AdvertisementImage.advertisement_id
-    ).join(Calendar, Advertisement.id==Calendar.advertisement_id).join(
         Category, Advertisement.category_id==Category.id
     ).join(
         User, Advertisement.user_id==User.id
@@ -217,53 +241,58 @@ async def get_advertisement(
             Advertisement.id==advertisement_id
         )
     )
-    async with session.begin() as conn:
-        result = (await conn.execute(query)).all()
-        if not result:
+    async with session.begin():
+        result = (await session.execute(query)).first()
+        if result is None:
             raise AdvertisementNotFound
     return {
-        "id": result[0].id, "title": result[0].title, "description": result[0].description, "video": result[0].video,
-        "place": result[0].place, "hour_price": result[0].hour_price, "day_price": result[0].day_price,
-        "week_price": result[0].week_price, "month_price": result[0].month_price,
-        "image_urls": set([image.url for image in result]), "admin_comment": result[0].admin_comment,
-        "phone_number": result[0].phone_number, "published": result[0].published, "lat_lon": result[0].lat_lon,
-        "days": set([d.day for d in result]), "is_deleted": result[0].is_deleted,
-        "category_name": result[0].category_name
+        "id": result.id, "title": result.title, "description": result.description, "video": result.video,
+        "place": result.place, "hour_price": result.hour_price, "day_price": result.day_price,
+        "week_price": result.week_price, "month_price": result.month_price,
+        "image_urls": result.image_urls or [], "admin_comment": result.admin_comment,
+        "image_srcsets": result.image_variants or [],
+        "phone_number": result.phone_number, "published": result.published, "lat_lon": result.lat_lon,
+        "days": ranges_to_days(result.available_days), "is_deleted": result.is_deleted,
+        "category_name": result.category_name
     }
 
 
 async def ban_user(
         phone_number: PhoneNumber,
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession, redis: Redis
 ) -> None:
     query = sa.update(User).where(User.phone_number==phone_number).values(
         {
             User.is_banned: True
         }
     ).returning(User.id)
-    async with session.begin() as conn:
-        user_id: UserId | None = await conn.scalar(query)
+    async with session.begin():
+        user_id: UserId | None = await session.scalar(query)
     if not user_id:
         raise UserNotFound
+    await invalidate_user_state(redis=redis, user_id=user_id)
+    await publish(events.UserBanStateChanged(user_id=user_id, is_banned=True))
 
 async def cancel_ban_user(
         phone_number: PhoneNumber,
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession, redis: Redis
 ) -> None:
     query = sa.update(User).where(User.phone_number==phone_number).values(
         {
             User.is_banned: False
         }
     ).returning(User.id)
-    async with session.begin() as conn:
-        user_id: UserId | None = await conn.scalar(query)
+    async with session.begin():
+        user_id: UserId | None = await session.scalar(query)
     if not user_id:
         raise UserNotFound
+    await invalidate_user_state(redis=redis, user_id=user_id)
+    await publish(events.UserBanStateChanged(user_id=user_id, is_banned=False))
 
 
 async def advertisement_comment(
         advertisement_id: AdvertisementId,
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession,
         comment: str
 ) -> None:
     query = sa.update(Advertisement).where(
@@ -274,7 +303,8 @@ async def advertisement_comment(
             Advertisement.published: False
         }
     ).returning(Advertisement.id)
-    async with session.begin() as conn:
-        result: AdvertisementId | None = await conn.scalar(query)
+    async with session.begin():
+        result: AdvertisementId | None = await session.scalar(query)
     if not result:
         raise AdvertisementNotFound
+    await publish(events.AdvertisementUnpublished(advertisement_id))
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import sqlalchemy as sa
+
+from collections import defaultdict
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.advertisement.models import Category
+from src.advertisement.types import CategoryId
+
+logger = logging.getLogger("advertisement")
+
+CATEGORY_VERSION_KEY = "category-tree:version"
+CATEGORY_CHANNEL = "category-tree"
+# Shorter than the redis socket timeout so waiting for messages doesn't time out
+CATEGORY_LISTEN_TIMEOUT_SECONDS = 1.0
+
+
+class CategoryTree:
+    """
+    Categories by name and the ids of every category under each one,
+    the category itself included, however deep the tree is.
+    """
+    def __init__(self, version: int, rows: list[tuple[CategoryId, str, CategoryId | None]]) -> None:
+        self.version = version
+        self.ids_by_name: dict[str, CategoryId] = {name: category_id for category_id, name, _ in rows}
+        children: dict[CategoryId, list[CategoryId]] = defaultdict(list)
+        for category_id, _, parent_id in rows:
+            if parent_id is not None:
+                children[parent_id].append(category_id)
+        self.descendants: dict[CategoryId, frozenset[CategoryId]] = {}
+        for category_id, _, _ in rows:
+            found = {category_id}
+            stack = [category_id]
+            while stack:
+                for child_id in children[stack.pop()]:
+                    if child_id not in found:
+                        found.add(child_id)
+                        stack.append(child_id)
+            self.descendants[category_id] = frozenset(found)
+
+    def category_ids(self, name: str) -> list[CategoryId]:
+        """
+        The named category and all of its subcategories, empty for unknown names.
+        """
+        category_id = self.ids_by_name.get(name)
+        if category_id is None:
+            return []
+        return sorted(self.descendants[category_id])
+
+
+_tree: CategoryTree | None = None
+# Highest version published so far, trees loaded before it are reloaded
+_latest_version = 0
+_tree_lock = asyncio.Lock()
+
+
+def _is_current(tree: CategoryTree | None) -> bool:
+    return tree is not None and tree.version >= _latest_version
+
+
+async def get_category_tree(redis: Redis, engine: AsyncEngine) -> CategoryTree:
+    """
+    The tree of this process, loaded again after any category changed.
+    """
+    global _tree
+    if _is_current(_tree):
+        return _tree # type: ignore
+    async with _tree_lock:
+        if not _is_current(_tree):
+            # The version is read first so a change during the load bumps it again
+            version = int(await redis.get(CATEGORY_VERSION_KEY) or 0)
+            async with engine.connect() as conn:
+                rows = (await conn.execute(sa.select(Category.id, Category.name, Category.parent_category))).all()
+            _tree = CategoryTree(version=version, rows=[tuple(row) for row in rows]) # type: ignore
+        return _tree # type: ignore
+
+
+def invalidate_category_tree(version: int | None = None) -> None:
+    """
+    Marks trees older than version as outdated, without a version the tree is dropped.
+    """
+    global _tree, _latest_version
+    if version is None:
+        _tree = None
+    else:
+        _latest_version = max(_latest_version, version)
+
+
+async def bump_category_version(redis: Redis) -> None:
+    """
+    Tells every process, this one included, that categories changed.
+    """
+    version = await redis.incr(CATEGORY_VERSION_KEY)
+    invalidate_category_tree(version)
+    await redis.publish(CATEGORY_CHANNEL, version)
+
+
+async def listen_for_category_changes(redis: Redis) -> None:
+    """
+    Drops the tree on every version published by bump_category_version,
+    runs until cancelled and resubscribes when the connection fails.
+    """
+    while True:
+        try:
+            async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(CATEGORY_CHANNEL)
+                # Versions published while not subscribed were missed
+                invalidate_category_tree()
+                while True:
+                    message = await pubsub.get_message(timeout=CATEGORY_LISTEN_TIMEOUT_SECONDS)
+                    if message is not None:
+                        invalidate_category_tree(int(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Listening for category changes failed!")
+            await asyncio.sleep(CATEGORY_LISTEN_TIMEOUT_SECONDS)
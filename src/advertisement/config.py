@@ -9,5 +9,19 @@ class AuthConfig(BaseSettings):
     ADVERTISEMENT_IMAGE_FORMATS: str
     ADDRESS_API_URL: str
     ADDRESS_TOKEN: str
+    VIEWS_FLUSH_INTERVAL_SECONDS: float = 10
+    MEDIA_GC_INTERVAL_SECONDS: float = 60
+    MEDIA_GC_RECONCILE_INTERVAL_SECONDS: float = 24 * 60 * 60
+    MEDIA_GC_GRACE_SECONDS: int = 24 * 60 * 60
+    IMAGE_VARIANT_WIDTHS: str = "320,640,1280"
+    IMAGE_VARIANT_QUALITY: int = 80
+    IMAGE_PROCESS_WORKERS: int = 2
+    ADDRESS_GEOHASH_PRECISION: int = 7
+    ADDRESS_CACHE_SECONDS: int = 30 * 24 * 60 * 60
+    # Homepage lists are invalidated by moderation events, see handlers
+    HOMEPAGE_CACHE_SECONDS: int = 60 * 60
+    TRENDING_DAYS: int = 7
+    TRENDING_HALF_LIFE_DAYS: float = 2
+    TRENDING_REFRESH_SECONDS: int = 60
 
 advertisement_settings = AuthConfig() # type: ignore
@@ -0,0 +1,31 @@
+from typing import NamedTuple
+
+from src.advertisement.types import AdvertisementId, CategoryId
+from src.auth.types import UserId
+
+
+class AdvertisementPublished(NamedTuple):
+    advertisement_id: AdvertisementId
+
+
+class AdvertisementUnpublished(NamedTuple):
+    advertisement_id: AdvertisementId
+
+
+class AdvertisementDeleted(NamedTuple):
+    advertisement_id: AdvertisementId
+
+
+class AdvertisementCategoryChanged(NamedTuple):
+    advertisement_id: AdvertisementId
+    previous_category_id: CategoryId | None
+
+
+class CategoryChanged(NamedTuple):
+    # None for new categories
+    category_id: CategoryId | None
+
+
+class UserBanStateChanged(NamedTuple):
+    user_id: UserId
+    is_banned: bool
@@ -1,6 +1,5 @@
 from fastapi import HTTPException, status
 
-from src.config import settings
 from src.advertisement.config import advertisement_settings
 
 
@@ -82,16 +81,34 @@ class UpdateMyAdException(HTTPException):
         self.detail = "You only can update advertisement which is your's,not deleted before and has admin_comment!"
 
 
-class DailyRateLimit(HTTPException):
+class InvalidUpload(HTTPException):
     def __init__(self) -> None:
-        self.status_code = status.HTTP_403_FORBIDDEN
-        self.detail = f"Daily rate limit exceeded!({settings.REQUEST_PER_DAY} PER DAY)"
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Uploaded file is missing or doesn't match the requested upload!"
 
 
-class HourlyRateLimit(HTTPException):
+class ConflictingVideoUpload(HTTPException):
     def __init__(self) -> None:
-        self.status_code = status.HTTP_403_FORBIDDEN
-        self.detail = f"Hourly rate limit exceeded!({settings.REQUEST_PER_HOUR} PER HOUR)"
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Send either a video file or an uploaded video, not both!"
+
+
+class InvalidCoordinates(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Coordinates must be in latitude,longitude format!"
+
+
+class NearRequired(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "near is required for searching in a radius or sorting by distance!"
+
+
+class InvalidDateRange(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "availableFrom must be before availableTo!"
 
 
 class AddressApiException(HTTPException):
@@ -0,0 +1,58 @@
+import httpx
+
+from redis.asyncio import Redis
+
+from src.http_client import get_http_client
+from src.advertisement import exceptions
+from src.advertisement.config import advertisement_settings
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    """
+    Standard base32 geohash, precision 7 is a cell of about 150m x 150m.
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    result, bits, bit_count, even = [], 0, 0, True
+    while len(result) < precision:
+        value, interval = (lon, lon_range) if even else (lat, lat_range)
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            result.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(result)
+
+
+def address_cache_key(lat: float, lon: float) -> str:
+    return f"address:{geohash(lat, lon, advertisement_settings.ADDRESS_GEOHASH_PRECISION)}"
+
+
+async def reverse_geocode(redis: Redis, lat: float, lon: float) -> str:
+    """
+    Address of the coordinates, nearby coordinates share the
+    cached address so repeated postings skip the address api.
+    """
+    cache_key = address_cache_key(lat, lon)
+    cached_address = await redis.get(name=cache_key)
+    if cached_address is not None:
+        return cached_address # type: ignore
+    url = f"{advertisement_settings.ADDRESS_API_URL}lat={lat}&lon={lon}"
+    header = {"x-api-key": advertisement_settings.ADDRESS_TOKEN}
+    try:
+        r = await get_http_client().get(url, headers=header)
+    except httpx.HTTPError:
+        raise exceptions.AddressApiException
+    if r.status_code != 200:
+        raise exceptions.AddressApiException
+    address: str = r.json()["address"]
+    await redis.set(name=cache_key, value=address, ex=advertisement_settings.ADDRESS_CACHE_SECONDS)
+    return address
@@ -0,0 +1,61 @@
+import sqlalchemy as sa
+
+from src.cache import invalidate
+from src.events import subscribe
+from src.database import get_redis_connection, session_factory
+from src.advertisement import events
+from src.advertisement.models import Advertisement
+from src.advertisement.service import MOST_VIEWED_ADS_KEY, RECENT_ADS_KEY
+from src.advertisement.leaderboards import sync_leaderboards, move_category
+from src.advertisement.categories import bump_category_version
+
+
+@subscribe(events.AdvertisementPublished)
+@subscribe(events.AdvertisementUnpublished)
+@subscribe(events.AdvertisementDeleted)
+@subscribe(events.CategoryChanged)
+@subscribe(events.UserBanStateChanged)
+async def invalidate_homepage_lists(_event) -> None:
+    # Lists are rebuilt by the next request, moderation changes are rare
+    # enough for that to be cheaper than patching the cached lists
+    await invalidate(get_redis_connection(), MOST_VIEWED_ADS_KEY, RECENT_ADS_KEY)
+
+
+@subscribe(events.AdvertisementPublished)
+@subscribe(events.AdvertisementUnpublished)
+@subscribe(events.AdvertisementDeleted)
+async def sync_advertisement_leaderboards(
+        event: events.AdvertisementPublished | events.AdvertisementUnpublished | events.AdvertisementDeleted
+) -> None:
+    await sync_leaderboards(
+        redis=get_redis_connection(), session_factory=session_factory, advertisement_ids=[event.advertisement_id]
+    )
+
+
+@subscribe(events.AdvertisementCategoryChanged)
+async def move_category_leaderboard(event: events.AdvertisementCategoryChanged) -> None:
+    redis = get_redis_connection()
+    query = sa.select(Advertisement.category_id).where(Advertisement.id==event.advertisement_id)
+    async with session_factory() as session:
+        category_id = await session.scalar(query)
+    if event.previous_category_id is not None and category_id is not None:
+        await move_category(
+            redis=redis, advertisement_id=event.advertisement_id,
+            previous_category_id=event.previous_category_id, category_id=category_id
+        )
+    await sync_leaderboards(redis=redis, session_factory=session_factory, advertisement_ids=[event.advertisement_id])
+
+
+@subscribe(events.UserBanStateChanged)
+async def sync_user_leaderboards(event: events.UserBanStateChanged) -> None:
+    query = sa.select(Advertisement.id).where(Advertisement.user_id==event.user_id)
+    async with session_factory() as session:
+        advertisement_ids = list((await session.scalars(query)).all())
+    await sync_leaderboards(
+        redis=get_redis_connection(), session_factory=session_factory, advertisement_ids=advertisement_ids
+    )
+
+
+@subscribe(events.CategoryChanged)
+async def refresh_category_trees(_event: events.CategoryChanged) -> None:
+    await bump_category_version(get_redis_connection())
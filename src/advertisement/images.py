@@ -0,0 +1,112 @@
+import io
+import asyncio
+import logging
+import multiprocessing
+import sqlalchemy as sa
+
+from PIL import Image, ImageOps
+from concurrent.futures import ProcessPoolExecutor
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from src.config import settings
+from src.advertisement.config import advertisement_settings
+from src.advertisement.models import AdvertisementImage
+from src.advertisement.media import enqueue_orphan_media, variant_key
+from src.s3.utils import get_s3_client, upload_many_to_s3
+
+logger = logging.getLogger("advertisement")
+
+image_process_pool: ProcessPoolExecutor | None = None
+
+
+def variant_widths() -> list[int]:
+    return sorted(int(width) for width in advertisement_settings.IMAGE_VARIANT_WIDTHS.split(","))
+
+
+def thumbnail_width() -> str:
+    """
+    Key of the variant which list endpoints return.
+    """
+    return str(variant_widths()[0])
+
+
+def resize_image(data: bytes, widths: list[int], quality: int) -> dict[int, bytes]:
+    """
+    Encodes WebP variants of the image, images narrower than a
+    width are not upscaled. Runs in the image process pool.
+    """
+    variants = {}
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        for width in widths:
+            variant = image.copy()
+            variant.thumbnail((width, width * 4))
+            buffer = io.BytesIO()
+            variant.save(buffer, format="WEBP", quality=quality, method=4)
+            variants[width] = buffer.getvalue()
+    return variants
+
+
+def start_image_process_pool() -> ProcessPoolExecutor:
+    """
+    Started by the lifespan. Workers are spawned rather than forked
+    from a process with a running event loop and open connections.
+    """
+    global image_process_pool
+    if image_process_pool is None:
+        image_process_pool = ProcessPoolExecutor(
+            max_workers=advertisement_settings.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return image_process_pool
+
+
+def close_image_process_pool() -> None:
+    global image_process_pool
+    if image_process_pool is not None:
+        image_process_pool.shutdown(cancel_futures=True)
+        image_process_pool = None
+
+
+async def _generate_variants(key: str) -> dict[str, str]:
+    client = await get_s3_client()
+    response = await client.get_object(Bucket=settings.BUCKET_NAME, Key=key)
+    async with response["Body"] as stream:
+        data = await stream.read()
+    widths = variant_widths()
+    encoded = await asyncio.get_running_loop().run_in_executor(
+        start_image_process_pool(), resize_image, data, widths, advertisement_settings.IMAGE_VARIANT_QUALITY
+    )
+    variants = {str(width): variant_key(key, width) for width in widths}
+    await upload_many_to_s3(
+        {variants[str(width)]: io.BytesIO(content) for width, content in encoded.items()}
+    )
+    return variants
+
+
+async def generate_image_variants(
+        redis: Redis, session_factory: async_sessionmaker[AsyncSession], keys: list[str]
+) -> None:
+    """
+    Background task run after images are stored, resizes
+    each image and records the variant keys on its row.
+    """
+    for key in keys:
+        try:
+            variants = await _generate_variants(key)
+        except Exception:
+            logger.exception("Couldn't generate image variants.", extra={"key": key})
+            continue
+        query = sa.update(AdvertisementImage).where(AdvertisementImage.url==key).values(
+            {
+                AdvertisementImage.variants: variants
+            }
+        ).returning(AdvertisementImage.id)
+        async with session_factory() as session:
+            async with session.begin():
+                updated = (await session.scalars(query)).all()
+        if not updated:
+            # The image was removed while its variants were being generated
+            await enqueue_orphan_media(redis=redis, keys=list(variants.values()))
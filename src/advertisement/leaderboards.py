@@ -0,0 +1,274 @@
+import logging
+import sqlalchemy as sa
+
+from uuid import UUID
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.commands.core import AsyncScript
+from redis.exceptions import LockError
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from src.config import settings
+from src.advertisement.config import advertisement_settings
+from src.advertisement.models import Advertisement
+from src.advertisement.types import AdvertisementId, CategoryId
+from src.advertisement.utils import equals_any
+from src.auth.models import User
+
+logger = logging.getLogger("advertisement")
+
+LEADERBOARD_KEY = "leaderboard:views"
+LEADERBOARD_BUILT_KEY = "leaderboard:views:built"
+TRENDING_KEY = "leaderboard:trending"
+REBUILD_KEY_PREFIX = "leaderboard:rebuild"
+REBUILD_BATCH_SIZE = 1000
+
+# Moves the score of ARGV[1] from the KEYS[1] to the KEYS[2] leaderboard,
+# keeping the higher score when it is already ranked there
+MOVE_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if score then
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    redis.call('ZADD', KEYS[2], 'GT', score, ARGV[1])
+end
+return score
+"""
+
+_move: AsyncScript | None = None
+
+
+def category_leaderboard_key(category_id: CategoryId) -> str:
+    return f"{LEADERBOARD_KEY}:category:{category_id}"
+
+
+def trending_bucket_key(day: datetime) -> str:
+    return f"{TRENDING_KEY}:{day.strftime('%Y%m%d')}"
+
+
+def trending_bucket_keys() -> list[str]:
+    """
+    Daily buckets of the trending window, today first.
+    """
+    today = datetime.now(timezone.utc)
+    return [trending_bucket_key(today - timedelta(days=age)) for age in range(advertisement_settings.TRENDING_DAYS)]
+
+
+def count_view(pipe: Pipeline, advertisement_id: AdvertisementId, category_id: CategoryId) -> None:
+    """
+    Queues the leaderboard increments of one view on pipe.
+    """
+    member = str(advertisement_id)
+    pipe.zincrby(LEADERBOARD_KEY, 1, member)
+    pipe.zincrby(category_leaderboard_key(category_id), 1, member)
+    bucket = trending_bucket_key(datetime.now(timezone.utc))
+    pipe.zincrby(bucket, 1, member)
+    pipe.expire(bucket, timedelta(days=advertisement_settings.TRENDING_DAYS + 1))
+
+
+# Ads which can be listed, the rest are left out of the leaderboards
+listed_condition = sa.and_(
+    Advertisement.published.is_(True),
+    Advertisement.is_deleted.is_(False),
+    User.is_banned.is_not(True)
+)
+
+
+def _rebuild_key(key: str) -> str:
+    # Outside of the category key pattern so scans don't find it
+    return f"{REBUILD_KEY_PREFIX}:{key}"
+
+
+def _member_keys(category_id: CategoryId | None) -> list[str]:
+    if category_id is None:
+        return [LEADERBOARD_KEY]
+    return [LEADERBOARD_KEY, category_leaderboard_key(category_id)]
+
+
+def _listed_advertisements() -> sa.Select:
+    return sa.select(Advertisement.id, Advertisement.category_id, Advertisement.views).join(
+        User, Advertisement.user_id==User.id
+    ).where(listed_condition)
+
+
+async def rebuild_leaderboards(redis: Redis, session_factory: async_sessionmaker[AsyncSession]) -> int | None:
+    """
+    Fills the view leaderboards from the database, used when redis lost
+    them. Advertisements are read in keyset batches into temporary keys
+    which replace the live ones in one transaction together with the
+    views still in the buffer, so views counted while building are
+    included through the buffer. None when another rebuild is running.
+    """
+    # Imported here since views imports this module
+    from src.advertisement.views import pending_views
+
+    lock = redis.lock(name=f"{LEADERBOARD_KEY}:lock", timeout=settings.CACHE_LOCK_SECONDS)
+    if not await lock.acquire(blocking=False):
+        return None
+    try:
+        # Left over by a rebuild which failed halfway
+        leftover_keys = [key async for key in redis.scan_iter(match=f"{REBUILD_KEY_PREFIX}:*")]
+        if leftover_keys:
+            await redis.delete(*leftover_keys)
+
+        built_keys: set[str] = set()
+        count = 0
+        last_id: AdvertisementId | None = None
+        while True:
+            query = _listed_advertisements().order_by(Advertisement.id).limit(REBUILD_BATCH_SIZE)
+            if last_id is not None:
+                query = query.where(Advertisement.id > last_id)
+            async with session_factory() as session:
+                rows = (await session.execute(query)).all()
+            if not rows:
+                break
+            scores: dict[str, dict[str, int]] = defaultdict(dict)
+            for row in rows:
+                for key in _member_keys(row.category_id):
+                    scores[_rebuild_key(key)][str(row.id)] = row.views
+                    built_keys.add(key)
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, members in scores.items():
+                    pipe.zadd(key, members)
+                await pipe.execute()
+            await lock.extend(settings.CACHE_LOCK_SECONDS, replace_ttl=True)
+            count += len(rows)
+            last_id = rows[-1].id
+
+        live_keys = [LEADERBOARD_KEY, *[key async for key in redis.scan_iter(match=f"{LEADERBOARD_KEY}:category:*")]]
+        pending = await pending_views(redis=redis)
+        pending_rows = []
+        if pending:
+            async with session_factory() as session:
+                pending_rows = (await session.execute(
+                    _listed_advertisements().where(equals_any(Advertisement.id, list(pending)))
+                )).all()
+        async with redis.pipeline(transaction=True) as pipe:
+            for row in pending_rows:
+                for key in _member_keys(row.category_id):
+                    pipe.zincrby(_rebuild_key(key), pending[row.id], str(row.id))
+                    built_keys.add(key)
+            stale_keys = [key for key in live_keys if key not in built_keys]
+            if stale_keys:
+                pipe.delete(*stale_keys)
+            for key in built_keys:
+                pipe.rename(_rebuild_key(key), key)
+            pipe.set(LEADERBOARD_BUILT_KEY, 1)
+            await pipe.execute()
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            pass
+    logger.info("Rebuilt view leaderboards.", extra={"advertisements": count})
+    return count
+
+
+async def sync_leaderboards(
+        redis: Redis, session_factory: async_sessionmaker[AsyncSession],
+        advertisement_ids: list[AdvertisementId]
+) -> None:
+    """
+    Adds the advertisements which can be listed back with their
+    stored views and removes the rest from every leaderboard.
+    """
+    if not advertisement_ids:
+        return
+    query = sa.select(
+        Advertisement.id, Advertisement.category_id, Advertisement.views, listed_condition.label("listed")
+    ).join(User, Advertisement.user_id==User.id).where(equals_any(Advertisement.id, advertisement_ids))
+    async with session_factory() as session:
+        rows = (await session.execute(query)).all()
+    async with redis.pipeline(transaction=True) as pipe:
+        for row in rows:
+            member = str(row.id)
+            category_key = category_leaderboard_key(row.category_id) if row.category_id is not None else None
+            if row.listed:
+                pipe.zadd(LEADERBOARD_KEY, {member: row.views}, gt=True)
+                if category_key:
+                    pipe.zadd(category_key, {member: row.views}, gt=True)
+            else:
+                pipe.zrem(LEADERBOARD_KEY, member)
+                if category_key:
+                    pipe.zrem(category_key, member)
+                for bucket in [TRENDING_KEY, *trending_bucket_keys()]:
+                    pipe.zrem(bucket, member)
+        await pipe.execute()
+
+
+async def move_category(
+        redis: Redis, advertisement_id: AdvertisementId,
+        previous_category_id: CategoryId, category_id: CategoryId
+) -> None:
+    """
+    Carries the score over to the new category, views which
+    are not flushed yet are only counted in the leaderboards.
+    """
+    global _move
+    if _move is None:
+        _move = redis.register_script(MOVE_SCRIPT)
+    await _move(
+        keys=[category_leaderboard_key(previous_category_id), category_leaderboard_key(category_id)],
+        args=[str(advertisement_id)], client=redis
+    )
+
+
+async def top_advertisements(
+        redis: Redis, session_factory: async_sessionmaker[AsyncSession],
+        limit: int, category_ids: list[CategoryId] | None = None
+) -> list[tuple[AdvertisementId, float]] | None:
+    """
+    Highest ranked (id, views) pairs, of the given categories when
+    category_ids is passed. Twice as many as needed are read
+    since hydration drops ads which can't be listed. None while
+    another caller rebuilds the leaderboards.
+    """
+    if not await redis.exists(LEADERBOARD_BUILT_KEY):
+        if await rebuild_leaderboards(redis=redis, session_factory=session_factory) is None:
+            return None
+    if category_ids is None:
+        keys = [LEADERBOARD_KEY]
+    else:
+        keys = [category_leaderboard_key(category_id) for category_id in category_ids]
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.zrevrange(key, 0, 2 * limit - 1, withscores=True)
+        results = await pipe.execute()
+    # An ad is in one category only, so merging the tops gives the top of the union
+    members = sorted((member for result in results for member in result), key=lambda item: item[1], reverse=True)
+    return [(AdvertisementId(UUID(member)), score) for member, score in members[:2 * limit]]
+
+
+async def top_advertisements_by_stored_views(
+        session_factory: async_sessionmaker[AsyncSession],
+        limit: int, category_ids: list[CategoryId] | None = None
+) -> list[tuple[AdvertisementId, float]]:
+    """
+    Same as top_advertisements from the database, without the views which
+    are not flushed yet. Used while the leaderboards are being rebuilt.
+    """
+    query = _listed_advertisements().order_by(Advertisement.views.desc()).limit(2 * limit)
+    if category_ids is not None:
+        query = query.where(equals_any(Advertisement.category_id, category_ids))
+    async with session_factory() as session:
+        rows = (await session.execute(query)).all()
+    return [(row.id, float(row.views)) for row in rows]
+
+
+async def trending_advertisements(redis: Redis, limit: int) -> list[tuple[AdvertisementId, float]]:
+    """
+    Views of the last TRENDING_DAYS days, each day weighing half
+    as much as the day after it every TRENDING_HALF_LIFE_DAYS.
+    """
+    if not await redis.exists(TRENDING_KEY):
+        weights = {
+            bucket: 0.5 ** (age / advertisement_settings.TRENDING_HALF_LIFE_DAYS)
+            for age, bucket in enumerate(trending_bucket_keys())
+        }
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.zunionstore(TRENDING_KEY, weights)
+            pipe.expire(TRENDING_KEY, advertisement_settings.TRENDING_REFRESH_SECONDS)
+            await pipe.execute()
+    members = await redis.zrevrange(TRENDING_KEY, 0, 2 * limit - 1, withscores=True)
+    return [(AdvertisementId(UUID(member)), score) for member, score in members]
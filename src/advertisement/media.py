@@ -0,0 +1,114 @@
+import os
+import re
+import logging
+import sqlalchemy as sa
+
+from datetime import datetime, timedelta, timezone
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from src.advertisement.config import advertisement_settings
+from src.advertisement.models import Advertisement, AdvertisementImage
+from src.advertisement.uploads import pending_upload_key
+from src.s3.utils import delete_many_from_s3, list_s3_objects, DELETE_OBJECTS_BATCH_SIZE
+
+logger = logging.getLogger("advertisement")
+
+ORPHAN_MEDIA_KEY = "orphan-media"
+VARIANT_KEY_PATTERN = re.compile(r"_(\d+)w\.webp$")
+
+
+def variant_key(key: str, width: int) -> str:
+    return f"{os.path.splitext(key)[0]}_{width}w.webp"
+
+
+def variant_width(key: str) -> int | None:
+    """
+    Width of a key made by variant_key, None for other keys.
+    """
+    match = VARIANT_KEY_PATTERN.search(key)
+    return int(match.group(1)) if match else None
+
+
+def image_keys(url: str, variants: dict[str, str] | None) -> list[str]:
+    """
+    Storage keys of an image row, the original and its variants.
+    """
+    return [url] + list((variants or {}).values())
+
+
+async def enqueue_orphan_media(redis: Redis, keys: list[str]) -> None:
+    """
+    Marks storage keys for deletion by collect_orphan_media.
+    """
+    keys = [key for key in keys if key]
+    if keys:
+        await redis.sadd(ORPHAN_MEDIA_KEY, *keys)
+
+
+async def _referenced_keys(session_factory: async_sessionmaker[AsyncSession], keys: list[str]) -> set[str]:
+    query = sa.union(
+        sa.select(AdvertisementImage.url).where(AdvertisementImage.url.in_(keys)),
+        sa.select(Advertisement.video).where(Advertisement.video.in_(keys))
+    )
+    # Variant keys are looked up as {width: key} pairs through ix_advertisement_images_variants
+    variants = [{str(width): key} for key in keys if (width := variant_width(key)) is not None]
+    async with session_factory() as session:
+        async with session.begin():
+            referenced = set((await session.scalars(query)).all())
+            if variants:
+                variants_query = sa.select(AdvertisementImage.variants).where(
+                    sa.or_(*[AdvertisementImage.variants.contains(variant) for variant in variants])
+                )
+                for row_variants in (await session.scalars(variants_query)).all():
+                    referenced.update(set(row_variants.values()).intersection(keys))
+    return referenced
+
+
+async def collect_orphan_media(redis: Redis, session_factory: async_sessionmaker[AsyncSession]) -> int:
+    """
+    Deletes the queued keys with DeleteObjects. Keys which are
+    referenced again are skipped and failed deletes are re-queued.
+    """
+    deleted = 0
+    while keys := await redis.spop(ORPHAN_MEDIA_KEY, count=DELETE_OBJECTS_BATCH_SIZE): # type: ignore
+        try:
+            referenced = await _referenced_keys(session_factory, keys)
+            orphans = [key for key in keys if key not in referenced]
+            failed = await delete_many_from_s3(orphans) if orphans else []
+        except Exception:
+            await redis.sadd(ORPHAN_MEDIA_KEY, *keys)
+            raise
+        if failed:
+            await redis.sadd(ORPHAN_MEDIA_KEY, *failed)
+            deleted += len(orphans) - len(failed)
+            break
+        deleted += len(orphans)
+    if deleted:
+        logger.info("Deleted orphan media.", extra={"objects": deleted})
+    return deleted
+
+
+async def reconcile_media(redis: Redis, session_factory: async_sessionmaker[AsyncSession]) -> int:
+    """
+    Queues bucket objects which no advertisement references. Objects
+    younger than MEDIA_GC_GRACE_SECONDS and pending uploads are kept,
+    they may belong to an advertisement which is being saved.
+    """
+    cutoff = datetime.now(tz=timezone.utc) - timedelta(seconds=advertisement_settings.MEDIA_GC_GRACE_SECONDS)
+    queued = 0
+    async for objects in list_s3_objects():
+        keys = [obj["Key"] for obj in objects if obj["LastModified"] < cutoff]
+        if not keys:
+            continue
+        referenced = await _referenced_keys(session_factory, keys)
+        candidates = [key for key in keys if key not in referenced]
+        if not candidates:
+            continue
+        pending = await redis.mget(keys=[pending_upload_key(key) for key in candidates])
+        orphans = [key for key, upload in zip(candidates, pending) if upload is None]
+        await enqueue_orphan_media(redis, orphans)
+        queued += len(orphans)
+    if queued:
+        logger.info("Found unreferenced media.", extra={"objects": queued})
+    return queued
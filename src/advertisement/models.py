@@ -1,35 +1,54 @@
 import sqlalchemy as sa
 import sqlalchemy.orm as so
 
-from sqlalchemy.schema import UniqueConstraint
+from sqlalchemy.dialects.postgresql import TSVECTOR, JSONB, DATEMULTIRANGE, DOUBLE_PRECISION, Range
 from datetime import datetime, date
 from uuid import uuid4
 
 from src.database import Base
 from src.advertisement.types import (
-    AdvertisementId, CategoryId, AdvertisementImageId, CalendarId, Price
+    AdvertisementId, CategoryId, AdvertisementImageId, Price
 )
 from src.auth.models import User
 from src.auth.types import UserId
 
+TEXT_SEARCH_CONFIG = "simple"
+
 
 class Advertisement(Base):
     __tablename__ = "advertisements"
+    __table_args__ = (
+        sa.Index("ix_advertisements_created_at_id", "created_at", "id"),
+        sa.Index("ix_advertisements_search_vector", "search_vector", postgresql_using="gin"),
+        sa.Index(
+            "ix_advertisements_place_trgm", "place",
+            postgresql_using="gin", postgresql_ops={"place": "gin_trgm_ops"}
+        ),
+        sa.Index("ix_advertisements_available_days", "available_days", postgresql_using="gist"),
+    )
     id: so.Mapped[AdvertisementId] = so.mapped_column(primary_key=True, default=uuid4)
     title: so.Mapped[str] = so.mapped_column(sa.String(250), index=True)
     description: so.Mapped[str] = so.mapped_column(sa.Text)
     place: so.Mapped[str] = so.mapped_column(sa.Text)
     lat_lon: so.Mapped[list[float] | None] = so.mapped_column(default=None)
     views: so.Mapped[int] = so.mapped_column(default=0)
-    video: so.Mapped[str | None] = so.mapped_column(sa.String(255))
+    video: so.Mapped[str | None] = so.mapped_column(sa.String(255), index=True)
     hour_price: so.Mapped[Price | None]
     day_price: so.Mapped[Price | None]
     week_price: so.Mapped[Price | None]
     month_price: so.Mapped[Price | None]
+    # Available days merged into ranges, see utils.days_to_ranges
+    available_days: so.Mapped[list[Range[date]]] = so.mapped_column(DATEMULTIRANGE, server_default="{}")
     admin_comment: so.Mapped[str | None] = so.mapped_column(sa.Text, default=None)
     published: so.Mapped[bool] = so.mapped_column(default=False)
     is_deleted: so.Mapped[bool] = so.mapped_column(default=False)
     created_at: so.Mapped[datetime] = so.mapped_column(default=sa.func.now())
+    search_vector: so.Mapped[str] = so.mapped_column(TSVECTOR, sa.Computed(
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(description, '')), 'B') || "
+        f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(place, '')), 'C')",
+        persisted=True
+    ), deferred=True)
 
     user_id: so.Mapped[UserId] = so.mapped_column(sa.ForeignKey(
         f"{User.__tablename__}.id", ondelete="CASCADE" # Users are not allowed to delete accounts so this method never executed
@@ -42,8 +61,24 @@ class Advertisement(Base):
         return f"{self.id} {self.title}"
 
 
+# lat_lon as a point of the earthdistance extension, queries must use the same
+# expression for ix_advertisements_location to be used. Positions are inlined
+# since a bound subscript doesn't match the index expression.
+LOCATION_EXPRESSION = sa.func.ll_to_earth(
+    sa.cast(Advertisement.lat_lon[sa.literal_column("1", sa.Integer)], DOUBLE_PRECISION),
+    sa.cast(Advertisement.lat_lon[sa.literal_column("2", sa.Integer)], DOUBLE_PRECISION)
+)
+sa.Index("ix_advertisements_location", LOCATION_EXPRESSION, postgresql_using="gist")
+
+
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (
+        sa.Index(
+            "ix_categories_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
     id: so.Mapped[CategoryId] = so.mapped_column(primary_key=True, autoincrement=True)
     name: so.Mapped[str] = so.mapped_column(sa.String(240), unique=True)
     created_at: so.Mapped[datetime] = so.mapped_column(default=sa.func.now())
@@ -56,24 +91,24 @@ class Category(Base):
         return f"{self.id} {self.name}"
 
 
-class Calendar(Base):
-    __tablename__ = "calendars"
-    __table_args__ = (UniqueConstraint("advertisement_id", "day"), )
-    id: so.Mapped[CalendarId] = so.mapped_column(primary_key=True, autoincrement=True)
-    day: so.Mapped[date]
-
-    advertisement_id: so.Mapped[AdvertisementId] = so.mapped_column(sa.ForeignKey(
-        f"{Advertisement.__tablename__}.id", ondelete="CASCADE"
-    ))
-
-    def __repr__(self) -> str:
-        return f"{self.id}, advertisement_id{self.advertisement_id}"
-
-
 class AdvertisementImage(Base):
     __tablename__ = "advertisement_images"
+    __table_args__ = (
+        # The image at position zero is the cover image of the advertisement
+        sa.Index(
+            "ix_advertisement_images_cover", "advertisement_id",
+            unique=True, postgresql_where=sa.text("position = 0")
+        ),
+        sa.Index(
+            "ix_advertisement_images_variants", "variants",
+            postgresql_using="gin", postgresql_ops={"variants": "jsonb_path_ops"}
+        ),
+    )
     id: so.Mapped[AdvertisementImageId] = so.mapped_column(primary_key=True, autoincrement=True)
-    url: so.Mapped[str] = so.mapped_column(sa.String(250))
+    url: so.Mapped[str] = so.mapped_column(sa.String(250), index=True)
+    position: so.Mapped[int] = so.mapped_column(default=0)
+    # Resized copies keyed by width, filled in by the image pipeline
+    variants: so.Mapped[dict[str, str] | None] = so.mapped_column(JSONB)
 
     advertisement_id: so.Mapped[AdvertisementId] = so.mapped_column(sa.ForeignKey(
         f"{Advertisement.__tablename__}.id", ondelete="CASCADE"
@@ -1,11 +1,16 @@
 from typing import Annotated
+from datetime import date
 
-from fastapi import APIRouter, status, UploadFile, File, Query, Depends
-from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, AsyncEngine
+from fastapi import APIRouter, status, UploadFile, File, Query, Depends, BackgroundTasks
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
 
-from src.database import get_session, get_engine
+from src.config import settings
+from src.database import get_session, get_engine, get_redis
+from src.rate_limit import RateLimit, limit_by_user
 from src.pagination import PaginatedResponse, pagination_query, PaginationQuerySchema
 from src.advertisement import service
+from src.advertisement import uploads
 from src.advertisement import schemas
 from src.advertisement.types import AdvertisementId
 from src.advertisement.dependencies import check_subscription_fee
@@ -21,23 +26,46 @@ router = APIRouter()
 )
 async def add_advertisement(
     payload: schemas.AdvertisementIn,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    background_tasks: BackgroundTasks,
     current_user: Annotated[User, Depends(check_subscription_fee)],
-    images: list[UploadFile],
+    images: Annotated[list[UploadFile], File()] = None, # type: ignore
     video: UploadFile | None = None,
 ) -> dict:
     await service.add_advertisement(
         session=session,
+        redis=redis,
+        background_tasks=background_tasks,
         user=current_user,
         payload=payload,
         video=video,
-        images=images
+        images=images or []
     )
     return {
         "title": payload.title, "description": payload.description
     }
 
 
+@router.post(
+    "/presigned-uploads/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=list[schemas.PresignedUploadOut],
+    dependencies=[Depends(limit_by_user(
+        "presigned-uploads", RateLimit(settings.PRESIGNED_UPLOAD_REQUESTS_PER_HOUR, 3600)
+    ))]
+)
+async def create_presigned_uploads(
+    payload: schemas.PresignedUploadsIn,
+    redis: Annotated[Redis, Depends(get_redis)],
+    current_user: Annotated[User, Depends(get_current_active_user)]
+) -> list[dict]:
+    result = await uploads.create_presigned_uploads(
+        redis=redis, user=current_user, files=payload.files
+    )
+    return result
+
+
 @router.get(
     "/published-advertisement/",
     status_code=status.HTTP_200_OK,
@@ -45,21 +73,32 @@ async def add_advertisement(
 )
 async def get_published_advertisement(
     engine: Annotated[AsyncEngine, Depends(get_engine)],
+    redis: Annotated[Redis, Depends(get_redis)],
     pagination_info: Annotated[PaginationQuerySchema, Depends(pagination_query)],
     text__icontains: Annotated[str | None, Query(alias="textIcontains", max_length=250)] = None,
+    text_search: Annotated[str | None, Query(alias="textSearch", max_length=250)] = None,
     place__icontains: Annotated[str | None, Query(alias="placeIcontains")] = None,
     hour_price__range: Annotated[str | None, Query(alias="hourPriceRange")] = None,
     day_price__range: Annotated[str | None, Query(alias="dayPriceRange")] = None,
     week_price__range: Annotated[str | None, Query(alias="weekPriceRange")] = None,
     month_price__range: Annotated[str | None, Query(alias="monthPriceRange")] = None,
-    category_name: Annotated[str | None, Query(alias="categoryName")] = None
+    category_name: Annotated[str | None, Query(alias="categoryName")] = None,
+    near: Annotated[str | None, Query(description="latitude,longitude")] = None,
+    radius_km: Annotated[float | None, Query(alias="radiusKm", gt=0)] = None,
+    sort: Annotated[schemas.PublishedAdvertisementSort, Query(alias="sortBy")] = (
+        schemas.PublishedAdvertisementSort.RELEVANCE
+    ),
+    available_from: Annotated[date | None, Query(alias="availableFrom")] = None,
+    available_to: Annotated[date | None, Query(alias="availableTo")] = None
 ):
     response = await service.get_published_advertisement(
-        engine=engine, limit=pagination_info.limit, offset=pagination_info.offset,
-        text__icontains=text__icontains, place__icontains=place__icontains,
+        engine=engine, redis=redis, limit=pagination_info.limit, offset=pagination_info.offset,
+        cursor=pagination_info.cursor, count_strategy=pagination_info.count_strategy,
+        text__icontains=text__icontains, text_search=text_search, place__icontains=place__icontains,
         hour_price__range=hour_price__range, day_price__range=day_price__range,
         week_price__range=week_price__range, month_price__range=month_price__range,
-        category_name=category_name
+        category_name=category_name, near=near, radius_km=radius_km, sort=sort,
+        available_from=available_from, available_to=available_to
     )
     return response
 
@@ -69,7 +108,7 @@ async def get_published_advertisement(
     response_model=list[schemas.MyAdvertisement]
 )
 async def list_my_advertisement(
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[User, Depends(get_current_active_user)],
 ):
     result = await service.list_my_advertisement(session=session, user=current_user)
@@ -82,7 +121,7 @@ async def list_my_advertisement(
 )
 async def delete_my_advertisement(
     advertisement_id: AdvertisementId,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[User, Depends(get_current_active_user)],
 ) -> None:
     await service.delete_my_advertisement(
@@ -97,10 +136,11 @@ async def delete_my_advertisement(
 )
 async def get_advertisement(
     advertisement_id: AdvertisementId,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> dict:
     result = await service.get_advertisement(
-        session=session, advertisement_id=advertisement_id
+        session=session, redis=redis, advertisement_id=advertisement_id
     )
     return result
 
@@ -108,15 +148,18 @@ async def get_advertisement(
 @router.get(
     "/show-phone-number/{advertisement_id}/",
     status_code=status.HTTP_200_OK,
-    response_model=schemas.ShowPhoneNumber
+    response_model=schemas.ShowPhoneNumber,
+    dependencies=[Depends(limit_by_user(
+        "show-phone-number",
+        RateLimit(settings.REQUEST_PER_HOUR, 3600), RateLimit(settings.REQUEST_PER_DAY, 86400)
+    ))]
 )
 async def show_phone_number(
     advertisement_id: AdvertisementId,
-    current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)]
 ) -> dict:
     phone_number = await service.show_phone_number(
-        session=session, user=current_user, advertisement_id=advertisement_id
+        session=session, advertisement_id=advertisement_id
     )
     return {"phoneNumber": phone_number}
 
@@ -129,7 +172,7 @@ async def show_phone_number(
 async def get_my_advertisement(
     advertisement_id: AdvertisementId,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
 ) -> dict:
     result = await service.get_my_advertisement(
         session=session, user=current_user, advertisement_id=advertisement_id
@@ -144,18 +187,22 @@ async def get_my_advertisement(
 async def update_my_advertisement(
     advertisement_id: AdvertisementId,
     payload: schemas.AdvertisementUpdate,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
+    background_tasks: BackgroundTasks,
     current_user: Annotated[User, Depends(get_current_active_user)],
     video: UploadFile | None = None,
     images: Annotated[list[UploadFile], File()] = None # type: ignore
 ) -> None:
     await service.update_my_advertisement(
         session=session,
+        redis=redis,
+        background_tasks=background_tasks,
         advertisement_id=advertisement_id,
         user=current_user,
         payload=payload,
         video=video,
-        images=images
+        images=images or []
     )
 
 
@@ -165,9 +212,23 @@ async def update_my_advertisement(
     response_model=list[schemas.MostViewedAds]
 )
 async def get_most_viewed_ads(
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    redis: Annotated[Redis, Depends(get_redis)],
+    engine: Annotated[AsyncEngine, Depends(get_engine)],
+    category_name: Annotated[str | None, Query(alias="categoryName")] = None
+):
+    result = await service.get_most_viewed_ads(redis=redis, engine=engine, category_name=category_name)
+    return result
+
+
+@router.get(
+    "/list/trending-ads/",
+    status_code=status.HTTP_200_OK,
+    response_model=list[schemas.TrendingAds]
+)
+async def get_trending_ads(
+    redis: Annotated[Redis, Depends(get_redis)]
 ):
-    result = await service.get_most_viewed_ads(session=session)
+    result = await service.get_trending_ads(redis=redis)
     return result
 
 
@@ -177,7 +238,7 @@ async def get_most_viewed_ads(
     response_model=list[schemas.RecentAds]
 )
 async def get_recent_ads(
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    redis: Annotated[Redis, Depends(get_redis)]
 ):
-    result = await service.get_recent_ads(session=session)
+    result = await service.get_recent_ads(redis=redis)
     return result
\ No newline at end of file
@@ -1,5 +1,6 @@
 import json
 
+from enum import Enum
 from decimal import Decimal
 from datetime import date, datetime
 from typing import Annotated, Self, Any
@@ -20,11 +21,13 @@ class AdvertisementIn(AdvertisementOut):
     category_name: Annotated[str, Field(alias="categoryName")]
     days: list[date]
     place: str | None = None
-    lat_lon: Annotated[list[float] | None, Field(alias="latLon")] = None
+    lat_lon: Annotated[list[float] | None, Field(alias="latLon", min_length=2, max_length=2)] = None
     hour_price: Annotated[Decimal | None, Field(alias="hourPrice")] = None
     day_price: Annotated[Decimal | None, Field(alias="dayPrice")] = None
     week_price: Annotated[Decimal | None, Field(alias="weekPrice")] = None
     month_price: Annotated[Decimal | None, Field(alias="monthPrice")] = None
+    uploaded_images: Annotated[list[str], Field(alias="uploadedImages")] = []
+    uploaded_video: Annotated[str | None, Field(alias="uploadedVideo")] = None
 
     @model_validator(mode="before")
     @classmethod
@@ -65,6 +68,12 @@ class AdvertisementIn(AdvertisementOut):
         return value
 
 
+class PublishedAdvertisementSort(str, Enum):
+    # Text search rank when textSearch is provided, newest first otherwise
+    RELEVANCE = "relevance"
+    DISTANCE = "distance"
+
+
 class PublishedAdvertisement(BaseModel):
     id: types.AdvertisementId
     title: Annotated[str, Field(max_length=250)]
@@ -72,6 +81,7 @@ class PublishedAdvertisement(BaseModel):
     place: str
     image: str
     category_name: Annotated[str, Field(serialization_alias="categoryName")]
+    distance_km: Annotated[float | None, Field(serialization_alias="distanceKm")] = None
 
     @field_validator("image", mode="after")
     @classmethod
@@ -108,7 +118,9 @@ class AdvertisementDetail(CustomBaseModel):
     day_price: Annotated[Decimal | None, Field(alias="dayPrice", default=None)]
     week_price: Annotated[Decimal | None, Field(alias="weekPrice", default=None)]
     month_price: Annotated[Decimal | None, Field(alias="monthPrice", default=None)]
-    image_urls: Annotated[set[str], Field(alias="imageUrls")]
+    image_urls: Annotated[list[str], Field(alias="imageUrls")]
+    # One srcset per image in the order of image_urls, None until the variants are generated
+    image_srcsets: Annotated[list[str | None], Field(alias="imageSrcsets")] = []
     days: set[date]
     category_name: Annotated[str, Field(alias="categoryName")]
 
@@ -121,11 +133,19 @@ class AdvertisementDetail(CustomBaseModel):
     
     @field_validator("image_urls", mode="after")
     @classmethod
-    def set_image_urls(cls, urls: set[str]) -> set[str]:
-        new_urls = set()
-        for url in urls:
-            new_urls.add(f"{settings.S3_API}/{url}")
-        return new_urls
+    def set_image_urls(cls, urls: list[str]) -> list[str]:
+        return [f"{settings.S3_API}/{url}" for url in urls]
+
+    @field_validator("image_srcsets", mode="before")
+    @classmethod
+    def set_image_srcsets(cls, variants: list[dict[str, str] | None]) -> list[str | None]:
+        return [
+            ", ".join(
+                f"{settings.S3_API}/{key} {width}w"
+                for width, key in sorted(variant.items(), key=lambda item: int(item[0]))
+            ) if variant else None
+            for variant in variants
+        ]
 
 
 class ShowPhoneNumber(CustomBaseModel):
@@ -137,6 +157,21 @@ class AdvertisementUpdate(AdvertisementIn):
     previous_video: Annotated[str | None, Field(validation_alias="previousVideo")] = None
 
 
+class PresignedUploadIn(CustomBaseModel):
+    content_type: Annotated[str, Field(alias="contentType")]
+    size: Annotated[int, Field(gt=0)]
+
+
+class PresignedUploadsIn(CustomBaseModel):
+    files: Annotated[list[PresignedUploadIn], Field(min_length=1)]
+
+
+class PresignedUploadOut(CustomBaseModel):
+    key: str
+    url: str
+    content_type: Annotated[str, Field(alias="contentType")]
+
+
 class RecentAds(CustomBaseModel):
     id: types.AdvertisementId
     title: Annotated[str, Field(max_length=250)]
@@ -154,3 +189,7 @@ class RecentAds(CustomBaseModel):
 
 class MostViewedAds(RecentAds):
     views: int
+
+
+class TrendingAds(RecentAds):
+    score: float
@@ -1,33 +1,63 @@
-import httpx
 import os
-import json
 import sqlalchemy as sa
-import sqlalchemy.orm as so
 
 from uuid import uuid4
+from datetime import date, timedelta
 from typing import BinaryIO
-from fastapi import UploadFile
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, AsyncEngine
-
-from src.config import settings
-from src.database import get_redis_connection
-from src.pagination import paginate
+from fastapi import UploadFile, BackgroundTasks
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, async_sessionmaker
+from sqlalchemy.dialects.postgresql import Range
+
+from src.database import session_factory
+from src.cache import get_or_load, Uncached
+from src.events import publish
+from src.pagination import paginate, CountStrategy
 from src.advertisement import exceptions
 from src.advertisement import schemas
 from src.advertisement import types
+from src.advertisement import events
 from src.advertisement.config import advertisement_settings
-from src.s3.utils import upload_to_s3, delete_from_s3
-from src.advertisement.models import Advertisement, Category, AdvertisementImage, Calendar
+from src.advertisement.utils import (
+    image_urls_column, image_variants_column, cover_thumbnail_column,
+    location_column, earth_point, parse_coordinates, days_to_ranges, ranges_to_days, equals_any
+)
+from src.advertisement.views import record_view
+from src.advertisement.leaderboards import (
+    top_advertisements, top_advertisements_by_stored_views, trending_advertisements, listed_condition
+)
+from src.advertisement.uploads import finalize_uploads, discard_pending_uploads
+from src.advertisement.media import enqueue_orphan_media, image_keys
+from src.advertisement.images import generate_image_variants
+from src.advertisement.geocoding import reverse_geocode
+from src.advertisement.categories import get_category_tree
+from src.s3.utils import upload_many_to_s3
+from src.advertisement.models import (
+    Advertisement, Category, AdvertisementImage, TEXT_SEARCH_CONFIG
+)
 from src.auth.models import User
+from src.auth.cache import invalidate_user_state
+
+cover_image_condition = sa.and_(
+    Advertisement.id==AdvertisementImage.advertisement_id,
+    AdvertisementImage.position==0
+)
+
+
+MOST_VIEWED_ADS_KEY = "most-viewed-ads"
+RECENT_ADS_KEY = "recent-ads"
+HOMEPAGE_LIST_SIZE = 15
+
 
 async def add_advertisement(
-        session: async_sessionmaker[AsyncSession], user: User,
+        session: AsyncSession, redis: Redis, background_tasks: BackgroundTasks, user: User,
         payload: schemas.AdvertisementIn,
         video: UploadFile | None,
         images: list[UploadFile]
 ) -> None:
     # Validating video
+    if video and payload.uploaded_video:
+        raise exceptions.ConflictingVideoUpload
     if video:
         assert video.filename is not None
         video_ext = os.path.splitext(video.filename)[1]
@@ -37,9 +67,14 @@ async def add_advertisement(
         if video.size and video.size > advertisement_settings.ADVERTISEMENT_VIDEO_SIZE:
             raise exceptions.LargeVideoFile
 
+    if len(set(payload.days)) != len(payload.days):
+        raise exceptions.DuplicateSelectedDays
+
     # Validating images
-    if len(images) > advertisement_settings.ADVERTISEMENT_IMAGES_LIMIT:
+    if len(images) + len(payload.uploaded_images) > advertisement_settings.ADVERTISEMENT_IMAGES_LIMIT:
         raise exceptions.AdvertisementImageLimit
+    if len(images) + len(payload.uploaded_images) == 0:
+        raise exceptions.AtLeastOneImageExc
     image_unique_names: dict[str, BinaryIO] = dict()
     for image in images:
         if image.size and image.size > advertisement_settings.ADVERTISEMENT_IMAGE_SIZE:
@@ -51,25 +86,23 @@ async def add_advertisement(
         unique_image_filename = f"{uuid4()}{image_ext}"
         image_unique_names[unique_image_filename] = image.file
 
+    # Files which were uploaded with presigned urls
+    uploaded_video = payload.uploaded_video
+    await finalize_uploads(
+        redis=redis, user=user, image_keys=payload.uploaded_images, video_key=uploaded_video
+    )
+
     category_query = sa.select(Category.id).where(Category.name==payload.category_name)
     user_query = sa.update(User).where(User.id==user.id).values(
         {
             User.has_subscription_fee: False
         }
     )
-    header = {"x-api-key": advertisement_settings.ADDRESS_TOKEN}
-    if payload.lat_lon:
-        lat = payload.lat_lon[0]
-        lon = payload.lat_lon[1]
-        url = f"{advertisement_settings.ADDRESS_API_URL}lat={lat}&lon={lon}"
-        async with httpx.AsyncClient() as client:
-            r = await client.get(url, headers=header)
-        if r.status_code == 200:
-            address = r.json()["address"]
-        else:
-            raise exceptions.AddressApiException
-    async with session.begin() as conn:
-        category_id: types.CategoryId | None = await conn.scalar(category_query)
+    # The provided place takes precedence over the address of lat_lon
+    if payload.lat_lon and not payload.place:
+        address = await reverse_geocode(redis=redis, lat=payload.lat_lon[0], lon=payload.lat_lon[1])
+    async with session.begin():
+        category_id: types.CategoryId | None = await session.scalar(category_query)
         if not category_id:
             raise exceptions.InvalidCategoryName
         advertisement_query = sa.insert(Advertisement).values(
@@ -78,75 +111,115 @@ async def add_advertisement(
                     Advertisement.description: payload.description,
                     Advertisement.place: payload.place if payload.place else address,
                     Advertisement.lat_lon: payload.lat_lon,
-                    Advertisement.video: unique_video_filename if video else None,
+                    Advertisement.video: unique_video_filename if video else uploaded_video,
                     Advertisement.hour_price: payload.hour_price if payload.hour_price else None,
                     Advertisement.day_price: payload.day_price if payload.day_price else None,
                     Advertisement.week_price: payload.week_price if payload.week_price else None,
                     Advertisement.month_price: payload.month_price if payload.month_price else None,
                     Advertisement.category_id: category_id,
+                    Advertisement.available_days: days_to_ranges(payload.days),
                     Advertisement.user_id: user.id
                 }
             ).returning(Advertisement.id)
-        advertisement_id: types.AdvertisementId | None = await conn.scalar(advertisement_query)
-        await conn.execute(user_query)
+        advertisement_id: types.AdvertisementId | None = await session.scalar(advertisement_query)
+        await session.execute(user_query)
         image_query = sa.insert(AdvertisementImage).values(
                 [
                     {
                         AdvertisementImage.url: image_name,
+                        AdvertisementImage.position: position,
                         AdvertisementImage.advertisement_id: advertisement_id
-                    } for image_name in image_unique_names
+                    } for position, image_name in enumerate(
+                        list(image_unique_names) + payload.uploaded_images
+                    )
                 ]
             )
-        calendar_query = sa.insert(Calendar).values(
-            [
-                {
-                    Calendar.day: selected_day,
-                    Calendar.advertisement_id: advertisement_id
-                } for selected_day in payload.days
-            ]
-        )
-        await conn.execute(image_query)
-        try:
-            await conn.execute(calendar_query)
-        except IntegrityError:
-            raise exceptions.DuplicateSelectedDays
+        await session.execute(image_query)
+    await invalidate_user_state(redis=redis, user_id=user.id)
+    await discard_pending_uploads(
+        redis=redis, keys=payload.uploaded_images + ([uploaded_video] if uploaded_video else [])
+    )
 
-    # Uploading video
+    # Uploading video and images concurrently
+    uploads: dict[str, BinaryIO] = dict(image_unique_names)
     if video:
-        await upload_to_s3(file=video.file, unique_filename=unique_video_filename)
+        uploads[unique_video_filename] = video.file
+    await upload_many_to_s3(uploads)
 
-    # Uploading images
-    for image_unique_name, image_file in image_unique_names.items():
-        await upload_to_s3(file=image_file, unique_filename=image_unique_name)
+    # Thumbnails are generated after the response is sent
+    background_tasks.add_task(
+        generate_image_variants, redis=redis, session_factory=session_factory,
+        keys=list(image_unique_names) + payload.uploaded_images
+    )
 
 
 async def get_published_advertisement(
-        engine: AsyncEngine, limit: int, offset: int, text__icontains: str | None,
+        engine: AsyncEngine, redis: Redis, limit: int, offset: int, cursor: str | None,
+        count_strategy: CountStrategy, text__icontains: str | None, text_search: str | None,
         place__icontains: str | None, hour_price__range: str | None,
         day_price__range: str | None, week_price__range: str | None,
-        month_price__range: str | None, category_name: str | None
+        month_price__range: str | None, category_name: str | None,
+        near: str | None = None, radius_km: float | None = None,
+        sort: schemas.PublishedAdvertisementSort = schemas.PublishedAdvertisementSort.RELEVANCE,
+        available_from: date | None = None, available_to: date | None = None
 ):
-    subquery = sa.select(AdvertisementImage).distinct(AdvertisementImage.advertisement_id).subquery()
     query = sa.select(
         Advertisement.id, Advertisement.title, Advertisement.description, Advertisement.place,
         Advertisement.hour_price, Advertisement.day_price, Advertisement.week_price,
-        Advertisement.month_price, Category.id, Category.name.label("category_name"), subquery.c.url.label("image")
+        Advertisement.month_price, Category.id, Category.name.label("category_name"),
+        cover_thumbnail_column("image")
     ).select_from(Advertisement).join(
-        subquery, Advertisement.id==subquery.c.advertisement_id, isouter=True
+        AdvertisementImage, cover_image_condition, isouter=True
     ).join(
         Category, Advertisement.category_id==Category.id
     ).join(
         User, Advertisement.user_id==User.id
     ).where(sa.and_(
         Advertisement.published == True, Advertisement.is_deleted == False, User.is_banned == False # noqa
-    )).order_by(Advertisement.created_at.desc())
+    ))
     if text__icontains:
         query = query.where(sa.or_(
             Advertisement.title.ilike(f"%{text__icontains}%"),
             Advertisement.description.ilike(f"%{text__icontains}%")
         ))
+    keyset = (Advertisement.created_at.desc(), Advertisement.id.desc())
+    if text_search:
+        ts_query = sa.func.websearch_to_tsquery(
+            sa.literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig"), text_search
+        )
+        rank = sa.func.ts_rank(Advertisement.search_vector, ts_query, type_=sa.Float)
+        query = query.where(Advertisement.search_vector.bool_op("@@")(ts_query))
+        keyset = (rank.desc(), *keyset)
+    if near:
+        lat, lon = parse_coordinates(near)
+        location, point = location_column(), earth_point(lat, lon)
+        distance_km = sa.func.earth_distance(location, point, type_=sa.Float) / sa.literal(1000, sa.Float)
+        query = query.add_columns(distance_km.label("distance_km"))
+        if radius_km is not None:
+            radius = sa.literal(radius_km * 1000, sa.Float)
+            # earth_box is answered by ix_advertisements_location, earth_distance drops its corners
+            query = query.where(sa.and_(
+                sa.func.earth_box(point, radius).bool_op("@>")(location),
+                sa.func.earth_distance(location, point) <= radius
+            ))
+        if sort is schemas.PublishedAdvertisementSort.DISTANCE:
+            # <-> is the straight line distance, ordering by it is the same as by
+            # earth_distance but can be answered by a nearest neighbour index scan
+            distance = location.op("<->", return_type=sa.Float)(point)
+            query = query.where(Advertisement.lat_lon.is_not(None))
+            keyset = (distance.asc(), Advertisement.id.asc())
+    elif radius_km is not None or sort is schemas.PublishedAdvertisementSort.DISTANCE:
+        raise exceptions.NearRequired
     if place__icontains:
         query = query.where(Advertisement.place.ilike(f"%{place__icontains}%"))
+    if available_from or available_to:
+        start = available_from or available_to
+        end = available_to or available_from
+        assert start is not None and end is not None
+        if end < start:
+            raise exceptions.InvalidDateRange
+        # Answered by the GiST index of available_days
+        query = query.where(Advertisement.available_days.contains([Range(start, end + timedelta(days=1))]))
     if hour_price__range:
         query = query.where(Advertisement.hour_price.between(
             float(hour_price__range.split(",")[0]), float(hour_price__range.split(",")[1])
@@ -164,41 +237,33 @@ async def get_published_advertisement(
             float(month_price__range.split(",")[0]), float(month_price__range.split(",")[1])
         ))
     if category_name:
-        parent_category_table_name = so.aliased(Category)
-        category_subquery = (
-            sa.select(Category.id)
-            .select_from(Category)
-            .join(
-                parent_category_table_name,
-                Category.parent_category==parent_category_table_name.id,
-                isouter=True
-            )
-            .where(sa.or_(Category.name==category_name, parent_category_table_name.name==category_name))
-        ).subquery()
-        query = query.where(Category.id.in_(sa.select(category_subquery)))
+        # The category and its subcategories at any depth
+        category_tree = await get_category_tree(redis, engine)
+        query = query.where(equals_any(Advertisement.category_id, category_tree.category_ids(category_name)))
 
-    return await paginate(engine=engine, query=query, limit=limit, offset=offset)
+    return await paginate(
+        engine=engine, query=query, limit=limit, offset=offset, cursor=cursor,
+        keyset=keyset, count_strategy=count_strategy, redis=redis
+    )
 
 
 async def list_my_advertisement(
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession,
         user: User
 ):
-    subquery = sa.select(AdvertisementImage.url, AdvertisementImage.advertisement_id).distinct(
-        AdvertisementImage.advertisement_id
-    ).subquery()
     query = sa.select(
-        Advertisement.id, Advertisement.title, Advertisement.admin_comment, Advertisement.views, Advertisement.published, subquery.c.url.label("image")
+        Advertisement.id, Advertisement.title, Advertisement.admin_comment, Advertisement.views,
+        Advertisement.published, cover_thumbnail_column("image")
     ).select_from(Advertisement).join(
-        subquery, Advertisement.id == subquery.c.advertisement_id
+        AdvertisementImage, cover_image_condition
     ).where(Advertisement.user_id == user.id, Advertisement.is_deleted == False).order_by(Advertisement.created_at.desc()) # noqa
-    async with session.begin() as conn:
-        result = list((await conn.execute(query)).all())
+    async with session.begin():
+        result = list((await session.execute(query)).all())
     return result
 
 
 async def delete_my_advertisement(
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession,
         user: User, advertisement_id: types.AdvertisementId
 ) -> None:
     owner_query = sa.select(Advertisement.id).where(sa.and_(
@@ -211,30 +276,24 @@ async def delete_my_advertisement(
             Advertisement.is_deleted: True
         }
     )
-    async with session.begin() as conn:
-        result: types.AdvertisementId | None = await conn.scalar(owner_query)
+    async with session.begin():
+        result: types.AdvertisementId | None = await session.scalar(owner_query)
         if result is None:
             raise exceptions.NotOwner
-        await conn.execute(query)
+        await session.execute(query)
+    await publish(events.AdvertisementDeleted(advertisement_id))
 
 
 async def get_advertisement(
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession, redis: Redis,
         advertisement_id: types.AdvertisementId
 ):
-    update_views_query = sa.update(Advertisement).where(Advertisement.id==advertisement_id).values(
-        {
-            Advertisement.views: Advertisement.views + 1
-        }
-    )
     query = sa.select(
         Advertisement.id, Advertisement.title, Advertisement.description, Advertisement.video,
         Advertisement.place, Advertisement.hour_price, Advertisement.day_price, Advertisement.lat_lon,
-        Advertisement.week_price, Advertisement.month_price, AdvertisementImage.url,
-        User.phone_number, Calendar.day, Category.name.label("category_name")
+        Advertisement.week_price, Advertisement.month_price, Category.name.label("category_name"),
+        Advertisement.category_id, image_urls_column(), image_variants_column(), Advertisement.available_days
     ).select_from(Advertisement).join(
-        AdvertisementImage, Advertisement.id==AdvertisementImage.advertisement_id
-    ).join(Calendar, Advertisement.id==Calendar.advertisement_id).join(
         Category, Advertisement.category_id==Category.id
     ).where(
         sa.and_(
@@ -242,71 +301,44 @@ async def get_advertisement(
             Advertisement.published==True, Advertisement.is_deleted==False # noqa
         )
     )
-    async with session.begin() as conn:
-        result = (await conn.execute(query)).all()
-        if not result:
+    async with session.begin():
+        result = (await session.execute(query)).first()
+        if result is None:
             raise exceptions.AdvertisementNotFound
-        await conn.execute(update_views_query)
+    await record_view(redis=redis, advertisement_id=advertisement_id, category_id=result.category_id)
     return {
-        "id": result[0].id, "title": result[0].title, "description": result[0].description, "video": result[0].video,
-        "place": result[0].place, "hour_price": result[0].hour_price, "day_price": result[0].day_price,
-        "week_price": result[0].week_price, "month_price": result[0].month_price, "lat_lon": result[0].lat_lon,
-        "image_urls": set([image.url for image in result]),
-        "days": set([d.day for d in result]),
-        "category_name": result[0].category_name
+        "id": result.id, "title": result.title, "description": result.description, "video": result.video,
+        "place": result.place, "hour_price": result.hour_price, "day_price": result.day_price,
+        "week_price": result.week_price, "month_price": result.month_price, "lat_lon": result.lat_lon,
+        "image_urls": result.image_urls or [],
+        "image_srcsets": result.image_variants or [],
+        "days": ranges_to_days(result.available_days),
+        "category_name": result.category_name
     }
 
 
 async def show_phone_number(
-        session: async_sessionmaker[AsyncSession], user: User, advertisement_id: types.AdvertisementId
+        session: AsyncSession, advertisement_id: types.AdvertisementId
 ):
-    redis = get_redis_connection()
-    r = redis.mget(keys=[f"{user.id}:hourly_rate", f"{user.id}:daily_rate"])
-    if r[1] and int(r[1]) >= settings.REQUEST_PER_DAY: # type: ignore
-        raise exceptions.DailyRateLimit
-    if r[0] and int(r[0]) >= settings.REQUEST_PER_HOUR: # type: ignore
-        raise exceptions.HourlyRateLimit 
-    with redis.pipeline() as pipe:
-        pipe.multi()
-        if not r[0]: # type: ignore
-            pipe.set(
-                name=f"{user.id}:hourly_rate",
-                value="1" if not r[0] else str(int(r[0]) + 1), # type: ignore
-                ex=3600
-            )
-        else:
-            pipe.incr(name=f"{user.id}:hourly_rate")
-        if not r[1]: # type: ignore
-            pipe.set(
-                name=f"{user.id}:daily_rate",
-                value="1" if not r[1] else str(int(r[1]) + 1), # type: ignore
-                ex=86400
-            )
-        else:
-            pipe.incr(name=f"{user.id}:daily_rate")
-        pipe.execute()
-
     query = sa.select(User.phone_number).select_from(User).join(
         Advertisement, User.id==Advertisement.user_id
     ).where(Advertisement.id==advertisement_id)
 
-    async with session.begin() as conn:
-        phone_number = await conn.scalar(query)
+    async with session.begin():
+        phone_number = await session.scalar(query)
     return phone_number
 
 
 async def get_my_advertisement(
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession,
         user: User, advertisement_id: types.AdvertisementId
 ) -> dict:
     query = sa.select(
         Advertisement.id, Advertisement.title, Advertisement.description, Advertisement.video,
         Advertisement.place, Advertisement.hour_price, Advertisement.day_price, Advertisement.lat_lon,
-        Advertisement.week_price, Advertisement.month_price, AdvertisementImage.url,
-        User.phone_number, Calendar.day, Category.name.label("category_name")
+        Advertisement.week_price, Advertisement.month_price, Category.name.label("category_name"),
+        image_urls_column(), image_variants_column(), Advertisement.available_days
     ).select_from(Advertisement).join(
-        AdvertisementImage, Advertisement.id==AdvertisementImage.advertisement_id
-    ).join(Calendar, Advertisement.id==Calendar.advertisement_id).join(
         Category, Advertisement.category_id==Category.id
     ).where(
         sa.and_(
@@ -314,41 +346,42 @@ async def get_my_advertisement(
             Advertisement.is_deleted==False, Advertisement.admin_comment!=None # noqa
         )
     )
-    async with session.begin() as conn:
-        result = (await conn.execute(query)).all()
-        if not result:
+    async with session.begin():
+        result = (await session.execute(query)).first()
+        if result is None:
             raise exceptions.AdvertisementNotOwner
     return {
-        "id": result[0].id, "title": result[0].title, "description": result[0].description, "video": result[0].video,
-        "place": result[0].place, "hour_price": result[0].hour_price, "day_price": result[0].day_price,
-        "week_price": result[0].week_price, "month_price": result[0].month_price,
-        "image_urls": set([image.url for image in result]), "lat_lon": result[0].lat_lon,
-        "days": set([d.day for d in result]),
-        "category_name": result[0].category_name
+        "id": result.id, "title": result.title, "description": result.description, "video": result.video,
+        "place": result.place, "hour_price": result.hour_price, "day_price": result.day_price,
+        "week_price": result.week_price, "month_price": result.month_price,
+        "image_urls": result.image_urls or [], "lat_lon": result.lat_lon,
+        "image_srcsets": result.image_variants or [],
+        "days": ranges_to_days(result.available_days),
+        "category_name": result.category_name
     }
 
 
 async def update_my_advertisement(
-        session: async_sessionmaker[AsyncSession],
+        session: AsyncSession, redis: Redis, background_tasks: BackgroundTasks,
         user: User,
         advertisement_id: types.AdvertisementId,
         payload: schemas.AdvertisementUpdate,
         video: UploadFile | None,
         images: list[UploadFile]
 ) -> None:
-    owner_query = sa.select(Advertisement.id).where(sa.and_(
+    owner_query = sa.select(
+        Advertisement.id, Advertisement.video, Advertisement.available_days, Advertisement.category_id
+    ).where(sa.and_(
             Advertisement.user_id==user.id, Advertisement.id==advertisement_id,
             Advertisement.is_deleted==False, sa.and_( # noqa
                 Advertisement.admin_comment.is_not(None),
                 Advertisement.admin_comment!=""
             )
         )
-    )
-    async with session.begin() as conn:
-        owner_result: types.AdvertisementId | None = await conn.scalar(owner_query)
-    if owner_result is None:
-        raise exceptions.UpdateMyAdException
+    ).with_for_update()
 
+    if video and payload.uploaded_video:
+        raise exceptions.ConflictingVideoUpload
     if video:
         assert video.filename is not None
         video_ext = os.path.splitext(video.filename)[1]
@@ -357,13 +390,15 @@ async def update_my_advertisement(
             raise exceptions.InvalidVideoFormat
         if video.size and video.size > advertisement_settings.ADVERTISEMENT_VIDEO_SIZE:
             raise exceptions.LargeVideoFile
-        if payload.previous_video:
-            await delete_from_s3((payload.previous_video.split("/")[-1])[:-1])
 
-    if len(images) + len(payload.previous_images) > advertisement_settings.ADVERTISEMENT_IMAGES_LIMIT:
+    if len(set(payload.days)) != len(payload.days):
+        raise exceptions.DuplicateSelectedDays
+
+    new_images_count = len(images) + len(payload.uploaded_images)
+    if new_images_count + len(payload.previous_images) > advertisement_settings.ADVERTISEMENT_IMAGES_LIMIT:
         raise exceptions.AdvertisementImageLimit
 
-    if (len(images) + len(payload.previous_images)) == 1 and payload.previous_images[0] == "":
+    if new_images_count == 0 and (not payload.previous_images or payload.previous_images == [""]):
         raise exceptions.AtLeastOneImageExc
 
     image_unique_names: dict[str, BinaryIO] = dict()
@@ -377,57 +412,47 @@ async def update_my_advertisement(
         unique_image_filename = f"{uuid4()}{image_ext}"
         image_unique_names[unique_image_filename] = image.file
 
+    # Files which were uploaded with presigned urls
+    uploaded_video = payload.uploaded_video
+    await finalize_uploads(
+        redis=redis, user=user, image_keys=payload.uploaded_images, video_key=uploaded_video
+    )
+
     category_query = sa.select(Category.id).where(Category.name==payload.category_name)
 
-    header = {"x-api-key": advertisement_settings.ADDRESS_TOKEN}
     if payload.lat_lon:
-        lat = payload.lat_lon[0]
-        lon = payload.lat_lon[1]
-        url = f"{advertisement_settings.ADDRESS_API_URL}lat={lat}&lon={lon}"
-        async with httpx.AsyncClient() as client:
-            r = await client.get(url, headers=header)
-        if r.status_code == 200:
-            address = r.json()["address"]
-        else:
-            raise exceptions.AddressApiException
+        address = await reverse_geocode(redis=redis, lat=payload.lat_lon[0], lon=payload.lat_lon[1])
 
     new_video_file_name = None
     if video:
         new_video_file_name = unique_video_filename
-    elif not video and payload.previous_video:
+    elif uploaded_video:
+        new_video_file_name = uploaded_video
+    elif payload.previous_video:
         new_video_file_name = (payload.previous_video.split("/")[-1])[:-1]
 
     # Deleting all of the images
     delete_image_query = sa.delete(AdvertisementImage).where(
         AdvertisementImage.advertisement_id==advertisement_id
-    )
-
-    # Deleting all days
-    delete_calendar_query = sa.delete(Calendar).where(
-        Calendar.advertisement_id==advertisement_id
-    )
+    ).returning(AdvertisementImage.url, AdvertisementImage.variants)
 
-    # Inserting new days
-    calendar_query = sa.insert(Calendar).values(
-        [
-            {
-                Calendar.day: selected_day,
-                Calendar.advertisement_id: advertisement_id
-            } for selected_day in payload.days
-        ]
-    )
+    async with session.begin():
+        # Check the ownership inside the same transaction as the update
+        owner_result = (await session.execute(owner_query)).first()
+        if owner_result is None:
+            raise exceptions.UpdateMyAdException
 
-    async with session.begin() as conn:
         # Check whether the provided category exists or not
-        category_id: types.CategoryId | None = await conn.scalar(category_query)
+        category_id: types.CategoryId | None = await session.scalar(category_query)
         if not category_id:
             raise exceptions.InvalidCategoryName
 
-        await conn.execute(delete_image_query)
+        old_image_variants = {
+            image.url: image.variants for image in (await session.execute(delete_image_query)).all()
+        }
 
         # Updating advertisement with new attributes
-        advertisement_update_query = sa.update(Advertisement).where(Advertisement.id==advertisement_id).values(
-            {
+        advertisement_values = {
                 Advertisement.title: payload.title,
                 Advertisement.description: payload.description,
                 Advertisement.place: address if payload.lat_lon else payload.place,
@@ -440,102 +465,171 @@ async def update_my_advertisement(
                 Advertisement.category_id: category_id,
                 Advertisement.admin_comment: None
             }
-        )
-
-        await conn.execute(delete_calendar_query)
-
-        try:
-            await conn.execute(calendar_query)
-        except IntegrityError:
-            raise exceptions.DuplicateSelectedDays
-
-        await conn.execute(advertisement_update_query)
-        if len(images) > 0:
+        # Days are only written when they changed
+        available_days = days_to_ranges(payload.days)
+        if available_days != list(owner_result.available_days):
+            advertisement_values[Advertisement.available_days] = available_days
+        advertisement_update_query = sa.update(Advertisement).where(
+            Advertisement.id==advertisement_id
+        ).values(advertisement_values)
+        await session.execute(advertisement_update_query)
+
+        # Kept images come first so the cover image stays the same
+        image_names = [
+            ((image_name.split("/"))[-1])[:-1] for image_name in payload.previous_images if image_name != ""
+        ] + list(image_unique_names) + payload.uploaded_images
+        if image_names:
             image_query = sa.insert(AdvertisementImage).values(
                 [
                     {
                         AdvertisementImage.url: image_name,
+                        AdvertisementImage.position: position,
+                        AdvertisementImage.variants: old_image_variants.get(image_name),
                         AdvertisementImage.advertisement_id: advertisement_id
-                    } for image_name in image_unique_names
+                    } for position, image_name in enumerate(image_names)
                 ]
             )
-            await conn.execute(image_query)
+            await session.execute(image_query)
 
-        if len(payload.previous_images) > 0 and payload.previous_images[0] != "":
-            previous_image_query = sa.insert(AdvertisementImage).values(
-                [
-                    {
-                        AdvertisementImage.url: ((image_name.split("/"))[-1])[:-1],
-                        AdvertisementImage.advertisement_id: advertisement_id
-                    } for image_name in payload.previous_images
-                ]
-            )
-            await conn.execute(previous_image_query)
+    await discard_pending_uploads(
+        redis=redis, keys=payload.uploaded_images + ([uploaded_video] if uploaded_video else [])
+    )
+    # Replaced video and removed images are deleted in the background
+    orphans = [
+        key for image_name, variants in old_image_variants.items() if image_name not in image_names
+        for key in image_keys(image_name, variants)
+    ]
+    if owner_result.video and owner_result.video != new_video_file_name:
+        orphans.append(owner_result.video)
+    await enqueue_orphan_media(redis=redis, keys=orphans)
+    if owner_result.category_id != category_id:
+        await publish(events.AdvertisementCategoryChanged(
+            advertisement_id=advertisement_id, previous_category_id=owner_result.category_id
+        ))
 
-    # Uploading images
+    # Uploading video and images concurrently
+    uploads: dict[str, BinaryIO] = dict(image_unique_names)
     if video:
-        await upload_to_s3(file=video.file, unique_filename=unique_video_filename)
+        uploads[unique_video_filename] = video.file
+    await upload_many_to_s3(uploads)
 
-    for image_unique_name, image_file in image_unique_names.items():
-        await upload_to_s3(file=image_file, unique_filename=image_unique_name)
+    # Thumbnails are generated after the response is sent
+    background_tasks.add_task(
+        generate_image_variants, redis=redis, session_factory=session_factory,
+        keys=list(image_unique_names) + payload.uploaded_images
+    )
 
 
 async def get_most_viewed_ads(
-        session: async_sessionmaker[AsyncSession]
-):
-    redis = get_redis_connection()
-    cached_data = redis.get(name="most-viewed-ads")
-    if cached_data is not None:
-        return json.loads(cached_data) # type: ignore
-    subquery = sa.select(AdvertisementImage).distinct(AdvertisementImage.advertisement_id).subquery()
-    query = sa.select(
-        Advertisement.id, Advertisement.title, Advertisement.created_at, Advertisement.views,
-        Category.name.label("category_name"), subquery.c.url.label("image_url")
-    ).where(
-        sa.and_(
-            Advertisement.published.is_(True),
-            Advertisement.is_deleted.is_(False),
-            User.is_banned.is_not(True)
+        redis: Redis, engine: AsyncEngine, category_name: str | None = None,
+        session_factory: async_sessionmaker[AsyncSession] = session_factory
+) -> list[dict]:
+    if category_name:
+        category_ids = (await get_category_tree(redis, engine)).category_ids(category_name)
+        if not category_ids:
+            raise exceptions.InvalidCategoryName
+        ads, _ = await _load_most_viewed_ads(
+            redis=redis, session_factory=session_factory, category_ids=category_ids
         )
-    ).select_from(Advertisement).join(Category, Advertisement.category_id==Category.id).join(
-        subquery, Advertisement.id==subquery.c.advertisement_id
-    ).join(User, Advertisement.user_id==User.id).order_by(
-        Advertisement.views.desc()
-    ).limit(15)
+        return ads
+
+    async def load() -> list[dict] | Uncached:
+        ads, ranked_by_leaderboards = await _load_most_viewed_ads(redis=redis, session_factory=session_factory)
+        # The fallback ranking is only served until the leaderboards are rebuilt
+        return ads if ranked_by_leaderboards else Uncached(ads)
+    return await get_or_load(
+        redis=redis, key=MOST_VIEWED_ADS_KEY, loader=load, ttl=advertisement_settings.HOMEPAGE_CACHE_SECONDS
+    )
 
-    async with session.begin() as conn:
-        result = (await conn.execute(query)).all()
 
-    result_list = [
-        {
-            "id": str(ad.id),
-            "title": ad.title,
-            "created_at": ad.created_at.isoformat(),
-            "category_name": ad.category_name,
-            "image_url": ad.image_url,
-            "views": ad.views
-        }
-        for ad in result
+async def get_trending_ads(
+        redis: Redis, session_factory: async_sessionmaker[AsyncSession] = session_factory
+) -> list[dict]:
+    ranked = await trending_advertisements(redis=redis, limit=HOMEPAGE_LIST_SIZE)
+    return [
+        {**ad, "score": score}
+        for ad, score in await _hydrate_ranked_ads(session_factory=session_factory, ranked=ranked)
     ]
-    redis.set(
-        name="most-viewed-ads",
-        value=json.dumps(result_list),
-        ex=180
+
+
+async def _load_most_viewed_ads(
+        redis: Redis, session_factory: async_sessionmaker[AsyncSession],
+        category_ids: list[types.CategoryId] | None = None
+) -> tuple[list[dict], bool]:
+    """
+    Most viewed ads and whether they were ranked by the leaderboards,
+    the stored views rank them while the leaderboards are rebuilt.
+    """
+    ranked = await top_advertisements(
+        redis=redis, session_factory=session_factory, limit=HOMEPAGE_LIST_SIZE, category_ids=category_ids
     )
-    return result_list
+    ranked_by_leaderboards = ranked is not None
+    if ranked is None:
+        ranked = await top_advertisements_by_stored_views(
+            session_factory=session_factory, limit=HOMEPAGE_LIST_SIZE, category_ids=category_ids
+        )
+    ads = [
+        {**ad, "views": int(views)}
+        for ad, views in await _hydrate_ranked_ads(
+            session_factory=session_factory, ranked=ranked, category_ids=category_ids
+        )
+    ]
+    return ads, ranked_by_leaderboards
+
+
+async def _hydrate_ranked_ads(
+        session_factory: async_sessionmaker[AsyncSession],
+        ranked: list[tuple[types.AdvertisementId, float]],
+        category_ids: list[types.CategoryId] | None = None
+) -> list[tuple[dict, float]]:
+    """
+    Fetches the ranked ids with one primary key lookup, keeping the
+    ranking and dropping ads which can't be listed anymore.
+    """
+    if not ranked:
+        return []
+    query = sa.select(
+        Advertisement.id, Advertisement.title, Advertisement.created_at,
+        Category.name.label("category_name"), cover_thumbnail_column("image_url")
+    ).select_from(Advertisement).join(Category, Advertisement.category_id==Category.id).join(
+        AdvertisementImage, cover_image_condition
+    ).join(User, Advertisement.user_id==User.id).where(
+        listed_condition, equals_any(Advertisement.id, [advertisement_id for advertisement_id, _ in ranked])
+    )
+    if category_ids is not None:
+        query = query.where(equals_any(Advertisement.category_id, category_ids))
+    async with session_factory() as session:
+        rows = {row.id: row for row in (await session.execute(query)).all()}
+    return [
+        (
+            {
+                "id": str(ad.id),
+                "title": ad.title,
+                "created_at": ad.created_at.isoformat(),
+                "category_name": ad.category_name,
+                "image_url": ad.image_url
+            },
+            score
+        )
+        for ad, score in ((rows.get(advertisement_id), score) for advertisement_id, score in ranked)
+        if ad is not None
+    ][:HOMEPAGE_LIST_SIZE]
 
 
 async def get_recent_ads(
-        session: async_sessionmaker[AsyncSession]
-):
-    redis = get_redis_connection()
-    cached_data = redis.get("recent-ads")
-    if cached_data is not None:
-        return json.loads(cached_data) # type: ignore
-    subquery = sa.select(AdvertisementImage).distinct(AdvertisementImage.advertisement_id).subquery()
+        redis: Redis, session_factory: async_sessionmaker[AsyncSession] = session_factory
+) -> list[dict]:
+    async def load() -> list[dict]:
+        return await _load_recent_ads(session_factory=session_factory)
+    return await get_or_load(
+        redis=redis, key=RECENT_ADS_KEY, loader=load, ttl=advertisement_settings.HOMEPAGE_CACHE_SECONDS
+    )
+
+
+async def _load_recent_ads(session_factory: async_sessionmaker[AsyncSession]) -> list[dict]:
     query = sa.select(
         Advertisement.id, Advertisement.title, Advertisement.created_at, Advertisement.views,
-        Category.name.label("category_name"), subquery.c.url.label("image_url")
+        Category.name.label("category_name"), cover_thumbnail_column("image_url")
     ).where(
         sa.and_(
             Advertisement.published.is_(True),
@@ -543,15 +637,15 @@ async def get_recent_ads(
             User.is_banned.is_not(True)
         )
     ).select_from(Advertisement).join(Category, Advertisement.category_id==Category.id).join(
-        subquery, Advertisement.id==subquery.c.advertisement_id
+        AdvertisementImage, cover_image_condition
     ).join(User, Advertisement.user_id==User.id).order_by(
         Advertisement.created_at.desc()
-    ).limit(15)
+    ).limit(HOMEPAGE_LIST_SIZE)
 
-    async with session.begin() as conn:
-        result = (await conn.execute(query)).all()
-    
-    result_list = [
+    async with session_factory() as session:
+        result = (await session.execute(query)).all()
+
+    return [
         {
             "id": str(ad.id),
             "title": ad.title,
@@ -560,9 +654,3 @@ async def get_recent_ads(
             "image_url": ad.image_url,
         } for ad in result
     ]
-    redis.set(
-        name="recent-ads",
-        value=json.dumps(result_list),
-        ex=180
-    )
-    return result_list
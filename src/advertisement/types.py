@@ -5,6 +5,5 @@ from uuid import UUID
 AdvertisementId = NewType("AdvertisementId", UUID)
 CategoryId = NewType("CategoryId", int)
 Price = NewType("Price", Decimal)
-CalendarId = NewType("CalendarId", int)
 AdvertisementImageId = NewType("AdvertisementImageId", int)
 
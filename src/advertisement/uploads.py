@@ -0,0 +1,88 @@
+import json
+import asyncio
+import mimetypes
+
+from uuid import uuid4
+from redis.asyncio import Redis
+
+from src.config import settings
+from src.advertisement import exceptions
+from src.advertisement import schemas
+from src.advertisement.config import advertisement_settings
+from src.auth.models import User
+from src.s3.utils import generate_presigned_put, head_s3_object
+
+
+def pending_upload_key(key: str) -> str:
+    return f"pending-upload:{key}"
+
+
+def _upload_kind(file: schemas.PresignedUploadIn) -> str:
+    if file.content_type in advertisement_settings.ADVERTISEMENT_IMAGE_FORMATS.split(","):
+        if file.size > advertisement_settings.ADVERTISEMENT_IMAGE_SIZE:
+            raise exceptions.LargeImageFile
+        return "image"
+    if file.content_type in advertisement_settings.ADVERTISEMENT_VIDE_FORMATS.split(","):
+        if file.size > advertisement_settings.ADVERTISEMENT_VIDEO_SIZE:
+            raise exceptions.LargeVideoFile
+        return "video"
+    raise exceptions.InvalidImageFormat
+
+
+async def create_presigned_uploads(
+        redis: Redis, user: User, files: list[schemas.PresignedUploadIn]
+) -> list[dict]:
+    """
+    Issues presigned PUT urls and remembers who asked for
+    each key, so only its owner can attach it to an ad.
+    """
+    if len(files) > advertisement_settings.ADVERTISEMENT_IMAGES_LIMIT + 1:
+        raise exceptions.AdvertisementImageLimit
+    uploads = []
+    for file in files:
+        kind = _upload_kind(file)
+        key = f"{uuid4()}{mimetypes.guess_extension(file.content_type) or ''}"
+        url = await generate_presigned_put(key=key, content_type=file.content_type, size=file.size)
+        await redis.set(
+            name=pending_upload_key(key),
+            value=json.dumps({
+                "user_id": user.id, "kind": kind,
+                "content_type": file.content_type, "size": file.size
+            }),
+            # The client may start uploading right before the url expires
+            ex=settings.S3_PRESIGNED_URL_EXPIRES_SECONDS * 2
+        )
+        uploads.append({"key": key, "url": url, "content_type": file.content_type})
+    return uploads
+
+
+async def finalize_uploads(
+        redis: Redis, user: User, image_keys: list[str], video_key: str | None
+) -> None:
+    """
+    Checks that every key was issued to the user and that the
+    stored object has the announced size and content type.
+    """
+    keys = {key: "image" for key in image_keys}
+    if video_key:
+        keys[video_key] = "video"
+    if not keys:
+        return
+    pending = await redis.mget(keys=[pending_upload_key(key) for key in keys])
+    heads = await asyncio.gather(*[head_s3_object(key) for key in keys])
+    for (key, kind), data, head in zip(keys.items(), pending, heads):
+        if data is None or head is None:
+            raise exceptions.InvalidUpload
+        upload = json.loads(data)
+        if upload["user_id"] != user.id or upload["kind"] != kind:
+            raise exceptions.InvalidUpload
+        if head["ContentLength"] != upload["size"] or head["ContentType"] != upload["content_type"]:
+            raise exceptions.InvalidUpload
+
+
+async def discard_pending_uploads(redis: Redis, keys: list[str]) -> None:
+    """
+    Called once the keys are stored so they can't be attached twice.
+    """
+    if keys:
+        await redis.delete(*[pending_upload_key(key) for key in keys])
@@ -1,2 +1,101 @@
+import sqlalchemy as sa
+
+from datetime import date, timedelta
+from typing import Any, Iterable
+from sqlalchemy.dialects.postgresql import array_agg, aggregate_order_by, JSONB, Range, ARRAY
+
+from src.advertisement import exceptions
+from src.advertisement.models import Advertisement, AdvertisementImage, LOCATION_EXPRESSION
+from src.advertisement.images import thumbnail_width
+
+
 def create_slug(value: str) -> str:
-    return (value.lower()).replace(" ", "-")
\ No newline at end of file
+    return (value.lower()).replace(" ", "-")
+
+
+def image_urls_column() -> sa.Label:
+    """
+    Images of the advertisement in the enclosing query
+    as one array, cover image first.
+    """
+    return sa.select(
+        array_agg(aggregate_order_by(AdvertisementImage.url, AdvertisementImage.position))
+    ).where(
+        AdvertisementImage.advertisement_id==Advertisement.id
+    ).scalar_subquery().label("image_urls")
+
+
+def image_variants_column() -> sa.Label:
+    """
+    Variants of the images in the same order as image_urls_column.
+    """
+    return sa.select(
+        sa.func.jsonb_agg(
+            aggregate_order_by(AdvertisementImage.variants, AdvertisementImage.position), type_=JSONB
+        )
+    ).where(
+        AdvertisementImage.advertisement_id==Advertisement.id
+    ).scalar_subquery().label("image_variants")
+
+
+def cover_thumbnail_column(name: str) -> sa.Label:
+    """
+    Thumbnail of the joined cover image, the
+    original until its variants are generated.
+    """
+    return sa.func.coalesce(
+        AdvertisementImage.variants[thumbnail_width()].astext, AdvertisementImage.url
+    ).label(name)
+
+
+def days_to_ranges(days: list[date]) -> list[Range[date]]:
+    """
+    Merges the days into sorted half-open ranges,
+    the canonical form postgres keeps datemultirange in.
+    """
+    ranges: list[Range[date]] = []
+    for day in sorted(set(days)):
+        if ranges and ranges[-1].upper == day:
+            ranges[-1] = Range(ranges[-1].lower, day + timedelta(days=1))
+        else:
+            ranges.append(Range(day, day + timedelta(days=1)))
+    return ranges
+
+
+def ranges_to_days(ranges: list[Range[date]] | None) -> list[date]:
+    days: list[date] = []
+    for days_range in ranges or []:
+        day = days_range.lower if days_range.lower_inc else days_range.lower + timedelta(days=1)
+        upper = days_range.upper if not days_range.upper_inc else days_range.upper + timedelta(days=1)
+        while day < upper:
+            days.append(day)
+            day += timedelta(days=1)
+    return days
+
+
+def equals_any(column: sa.ColumnElement, values: Iterable[Any]) -> sa.ColumnElement[bool]:
+    """
+    `column = ANY(:values)`, one array parameter however many values there are.
+    """
+    return column == sa.any_(sa.literal(list(values), ARRAY(column.type)))
+
+
+def location_column() -> sa.ColumnElement:
+    """
+    Point of the advertisement in earthdistance, NULL without lat_lon.
+    """
+    return LOCATION_EXPRESSION
+
+
+def earth_point(lat: float, lon: float) -> sa.ColumnElement:
+    return sa.func.ll_to_earth(sa.literal(lat, sa.Float), sa.literal(lon, sa.Float))
+
+
+def parse_coordinates(value: str) -> tuple[float, float]:
+    try:
+        lat, lon = (float(part) for part in value.split(","))
+    except ValueError:
+        raise exceptions.InvalidCoordinates
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise exceptions.InvalidCoordinates
+    return lat, lon
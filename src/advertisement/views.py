@@ -0,0 +1,101 @@
+import logging
+import sqlalchemy as sa
+
+from uuid import UUID
+from redis.asyncio import Redis
+from redis.exceptions import LockError, ResponseError
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from src.config import settings
+from src.advertisement.models import Advertisement
+from src.advertisement.types import AdvertisementId, CategoryId
+from src.advertisement.leaderboards import count_view
+
+logger = logging.getLogger("advertisement")
+
+VIEWS_BUFFER_KEY = "advertisement-views"
+VIEWS_FLUSHING_KEY = f"{VIEWS_BUFFER_KEY}:flushing"
+
+
+async def record_view(redis: Redis, advertisement_id: AdvertisementId, category_id: CategoryId) -> None:
+    """
+    Counts a view in redis, flush_views applies it to the database later.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hincrby(name=VIEWS_BUFFER_KEY, key=str(advertisement_id), amount=1)
+        count_view(pipe, advertisement_id=advertisement_id, category_id=category_id)
+        await pipe.execute()
+
+
+async def pending_views(redis: Redis) -> dict[AdvertisementId, int]:
+    """
+    Views which are counted but not flushed to the database yet.
+    """
+    async with redis.pipeline() as pipe:
+        pipe.hgetall(name=VIEWS_BUFFER_KEY)
+        pipe.hgetall(name=VIEWS_FLUSHING_KEY)
+        buffers: list[dict[str, str]] = await pipe.execute()
+    views: dict[AdvertisementId, int] = {}
+    for buffer in buffers:
+        for key, value in buffer.items():
+            advertisement_id = AdvertisementId(UUID(key))
+            views[advertisement_id] = views.get(advertisement_id, 0) + int(value)
+    return views
+
+
+def views_values(views: dict[AdvertisementId, int]) -> sa.Values:
+    """
+    Pending views as a VALUES list for joining with advertisements.
+    """
+    return sa.values(
+        sa.column("advertisement_id", Advertisement.id.type),
+        sa.column("views", sa.Integer),
+        name="pending_views"
+    ).data(list(views.items()))
+
+
+async def _apply_flushing_views(redis: Redis, session_factory: async_sessionmaker[AsyncSession]) -> int:
+    buffer: dict[str, str] = await redis.hgetall(name=VIEWS_FLUSHING_KEY) # type: ignore
+    views = {AdvertisementId(UUID(key)): int(value) for key, value in buffer.items()}
+    if views:
+        pending = views_values(views)
+        query = sa.update(Advertisement).where(Advertisement.id==pending.c.advertisement_id).values(
+            {
+                Advertisement.views: Advertisement.views + pending.c.views
+            }
+        )
+        async with session_factory() as session:
+            async with session.begin():
+                await session.execute(query)
+    await redis.delete(VIEWS_FLUSHING_KEY)
+    return len(views)
+
+
+async def flush_views(redis: Redis, session_factory: async_sessionmaker[AsyncSession]) -> int:
+    """
+    Applies buffered views to the database in one UPDATE.
+    The buffer is renamed to a fixed key first so views counted during
+    the flush go to a new buffer. Views left there by a flush which failed
+    or crashed are applied by the next one, so none are lost, though a
+    crash right after the UPDATE commits applies them twice.
+    """
+    lock = redis.lock(name=f"{VIEWS_BUFFER_KEY}:lock", timeout=settings.CACHE_LOCK_SECONDS)
+    if not await lock.acquire(blocking=False):
+        return 0
+    try:
+        flushed = 0
+        if await redis.exists(VIEWS_FLUSHING_KEY):
+            flushed += await _apply_flushing_views(redis=redis, session_factory=session_factory)
+        try:
+            await redis.rename(VIEWS_BUFFER_KEY, VIEWS_FLUSHING_KEY)
+        except ResponseError:
+            # Nothing was viewed since the last flush
+            return flushed
+        flushed += await _apply_flushing_views(redis=redis, session_factory=session_factory)
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            pass
+    logger.info("Flushed views.", extra={"advertisements": flushed})
+    return flushed
@@ -0,0 +1,54 @@
+import json
+
+from redis.asyncio import Redis
+
+from src.cache import current_generation, store, invalidate
+from src.auth.config import auth_config
+from src.auth.models import User
+from src.auth.types import UserId
+
+
+def user_state_key(user_id: UserId) -> str:
+    return f"user-state:{user_id}"
+
+
+async def get_cached_user(redis: Redis, user_id: UserId) -> User | None:
+    """
+    User built from the cached state, it is not attached to a
+    session and doesn't have the password or created_at loaded.
+    """
+    cached_data = await redis.get(name=user_state_key(user_id))
+    if cached_data is None:
+        return None
+    return User(**json.loads(cached_data))
+
+
+async def user_state_generation(redis: Redis, user_id: UserId) -> str:
+    """
+    Must be read before loading the user passed to cache_user.
+    """
+    return await current_generation(redis=redis, key=user_state_key(user_id))
+
+
+async def cache_user(redis: Redis, user: User, generation: str) -> None:
+    """
+    Skipped when the state was invalidated after generation was
+    read, so a user loaded before a ban isn't cached as unbanned.
+    """
+    state = {
+        "id": user.id, "phone_number": user.phone_number, "rule": user.rule,
+        "is_active": user.is_active, "is_banned": user.is_banned,
+        "has_subscription_fee": user.has_subscription_fee
+    }
+    await store(
+        redis=redis, key=user_state_key(user.id), value=json.dumps(state),
+        ex=auth_config.USER_STATE_CACHE_SECONDS, generation=generation
+    )
+
+
+async def invalidate_user_state(redis: Redis, user_id: UserId) -> None:
+    """
+    Must be called after changing any of the cached
+    columns so the change takes effect immediately.
+    """
+    await invalidate(redis, user_state_key(user_id))
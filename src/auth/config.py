@@ -11,6 +11,9 @@ class AuthConfig(BaseSettings):
     SMS_URL: str
     SMS_TOKEN: str
     SMS_FROM: str
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASHING_CONCURRENCY: int = 4
+    USER_STATE_CACHE_SECONDS: int = 30
 
 
 auth_config = AuthConfig() # type: ignore
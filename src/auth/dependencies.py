@@ -2,13 +2,15 @@ import jwt
 
 from typing import Annotated, Literal
 from fastapi import Depends
-from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordBearer
 
 from src.auth.types import UserId
-from src.database import get_session
+from src.database import get_session, get_redis
 from src.auth import exceptions
 from src.auth import service
+from src.auth.cache import get_cached_user, cache_user, user_state_generation
 from src.auth.config import auth_config
 from src.auth.models import User
 
@@ -28,13 +30,18 @@ async def decode_access_token(token: Annotated[str, Depends(oauth2_schema)]) ->
 
 async def get_current_active_user(
         data: Annotated[dict, Depends(decode_access_token)],
-        session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+        session: Annotated[AsyncSession, Depends(get_session)],
+        redis: Annotated[Redis, Depends(get_redis)]
 ):
     if "user_id" not in data:
         raise exceptions.CredentialsException
     user_id: UserId | None = data.get("user_id")
     assert user_id is not None
-    user: User = await service.get_user_by_id(id=user_id, session=session)
+    user: User | None = await get_cached_user(redis=redis, user_id=user_id)
+    if user is None:
+        generation = await user_state_generation(redis=redis, user_id=user_id)
+        user = await service.get_user_by_id(id=user_id, session=session)
+        await cache_user(redis=redis, user=user, generation=generation)
     if user.is_active is False:
         raise exceptions.NotActiveUser
     if user.is_banned:
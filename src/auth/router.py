@@ -3,10 +3,13 @@ import logging
 from typing import Annotated
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi import APIRouter, status, Depends, BackgroundTasks
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.models import User
-from src.database import get_session
+from src.config import settings
+from src.database import get_session, get_redis
+from src.rate_limit import RateLimit, limit_by_ip
 from src.auth import schemas
 from src.auth import service
 from src.auth.dependencies import get_current_active_user
@@ -21,16 +24,19 @@ router = APIRouter()
         "/register/",
         response_model=schemas.RegisterOut,
         status_code=status.HTTP_201_CREATED,
-        description="Password must at least has 8 chars."
+        description="Password must at least has 8 chars.",
+        dependencies=[Depends(limit_by_ip("register", RateLimit(settings.REGISTER_REQUESTS_PER_HOUR, 3600)))]
 )
 async def register(
     payload: schemas.RegisterIn,
     worker: BackgroundTasks,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
 ) -> schemas.RegisterOut:
     verification_code = generate_random_code()
     await service.register(
         session=session,
+        redis=redis,
         payload=payload,
         verification_code=verification_code,
     )
@@ -41,11 +47,12 @@ async def register(
 @router.post(
     "/login/",
     response_model=schemas.LoginOut,
-    status_code=status.HTTP_200_OK
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(limit_by_ip("login", RateLimit(settings.LOGIN_REQUESTS_PER_MINUTE, 60)))]
 )
 async def login(
     payload: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)]
 ) -> schemas.LoginOut:
     access_token = await service.login(
         session=session, payload=payload
@@ -58,10 +65,11 @@ async def login(
 @router.post("/verify-account/", status_code=status.HTTP_200_OK)
 async def verify_account(
     payload: schemas.VerificationIn,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> dict:
     await service.verify_account(
-        session=session, verification_code=payload.verification_code
+        session=session, redis=redis, verification_code=payload.verification_code
     )
     return {"detail": "Account verified successfully"}
 
@@ -69,12 +77,14 @@ async def verify_account(
 @router.post("/resend/verification-code/", status_code=status.HTTP_200_OK)
 async def resend_verification_code(
     payload: schemas.ResendVerificationCode,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)],
     worker: BackgroundTasks
 ):
     verification_code = generate_random_code()
     await service.resend_verification_code(
-        session=session, phone_number=payload.phone_number, verification_code=verification_code
+        session=session, redis=redis,
+        phone_number=payload.phone_number, verification_code=verification_code
     )
     worker.add_task(service.send_message, payload.phone_number, verification_code)
     return {"detail": "Verification code was resent."}
@@ -84,7 +94,7 @@ async def resend_verification_code(
 async def change_password(
     payload: schemas.ChangePasswordIn,
     active_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)]
 ) -> dict:
     await service.change_password(
         user=active_user, session=session, payload=payload
@@ -92,15 +102,23 @@ async def change_password(
     return {"detail": "Password changed successfully"}
 
 
-@router.post("/reset-password/",status_code=status.HTTP_200_OK)
+@router.post(
+    "/reset-password/",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(limit_by_ip(
+        "reset-password", RateLimit(settings.RESET_PASSWORD_REQUESTS_PER_HOUR, 3600)
+    ))]
+)
 async def reset_password(
     payload: schemas.ResetPasswordIn,
     worker: BackgroundTasks,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> dict:
     random_password = (generate_random_code(8))
     if await service.reset_password(
-        session=session, phone_number=payload.phone_number, random_password=random_password
+        session=session, redis=redis,
+        phone_number=payload.phone_number, random_password=random_password
     ):
         worker.add_task(service.send_message, payload.phone_number, random_password)
     return {"detail": "Temporary password was sent for you."}
@@ -109,9 +127,10 @@ async def reset_password(
 @router.post("/reset-password/verify/", status_code=status.HTTP_200_OK)
 async def verify_reset_password(
     payload: schemas.VerifyResetPasswordIn,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ) -> dict:
     await service.verify_reset_password(
-        session=session, random_password=payload.random_password
+        session=session, redis=redis, random_password=payload.random_password
     )
     return {"detail": "Password reset successfully.Change it to your favorite."}
@@ -1,37 +1,37 @@
-import httpx
 import asyncio
 import logging
 import sqlalchemy as sa
 
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.http_client import get_http_client
 from src.auth import schemas
-from src.database import get_redis_connection
 from src.auth import exceptions
 from src.auth import utils
 from src.auth.config import auth_config
 from src.auth.types import Password, UserId, PhoneNumber
 from src.auth.models import User
+from src.auth.cache import invalidate_user_state
 
 logger = logging.getLogger("auth")
 
 
 async def send_message(phone_number: PhoneNumber, subject: str):
     sms_service_url = f"{auth_config.SMS_URL}/{auth_config.SMS_URL}/sms/send.json?receptor=09134191562?sender=20006535&message=123456"
-    async with httpx.AsyncClient() as client:
-        r = await client.post(sms_service_url)
-        # TODO: Fix this
-        print(r)
+    r = await get_http_client().post(sms_service_url)
+    # TODO: Fix this
+    print(r)
     if r.status_code != 200:
         logger.error("SMS service doesn't work correctly!")
 
 
-async def get_user_by_id(id: UserId, session: async_sessionmaker[AsyncSession]) -> User:
+async def get_user_by_id(id: UserId, session: AsyncSession) -> User:
     query = sa.select(User).where(User.id == id)
-    async with session.begin() as conn:
-        user = (await conn.execute(query)).first()
+    async with session.begin():
+        user = (await session.execute(query)).first()
     if not user:
         raise exceptions.UserNotFound
 
@@ -39,9 +39,10 @@ async def get_user_by_id(id: UserId, session: async_sessionmaker[AsyncSession])
 
 
 async def register(
-        *, session: async_sessionmaker[AsyncSession], payload: schemas.RegisterIn, verification_code: str
+        *, session: AsyncSession, redis: Redis,
+        payload: schemas.RegisterIn, verification_code: str
 ) -> None:
-    hashed_password = utils.get_password_hash(password=payload.password)
+    hashed_password = await utils.get_password_hash(password=payload.password)
     query = sa.insert(User).values(
         {
             User.phone_number: payload.phone_number,
@@ -49,9 +50,9 @@ async def register(
         }
     )
     try:
-        async with session.begin() as conn:
-            await conn.execute(query)
-        get_redis_connection().set(
+        async with session.begin():
+            await session.execute(query)
+        await redis.set(
             name=f"verification_code:{verification_code}",
             value=payload.phone_number,
             ex=auth_config.VERIFICATION_CODE_LIFE_TIME_SECONDS
@@ -61,27 +62,28 @@ async def register(
 
 
 async def resend_verification_code(
-        *, session: async_sessionmaker[AsyncSession], phone_number: PhoneNumber, verification_code: str
+        *, session: AsyncSession, redis: Redis,
+        phone_number: PhoneNumber, verification_code: str
 ) -> None:
     query = sa.select(User).where(User.phone_number==phone_number)
-    async with session.begin() as conn:
-        result: User | None = (await conn.scalar(query))
+    async with session.begin():
+        result: User | None = (await session.scalar(query))
     if result is None:
         raise exceptions.UserNotFound
-    get_redis_connection().set(
+    await redis.set(
             name=f"verification_code:{verification_code}",
             value=phone_number,
             ex=auth_config.VERIFICATION_CODE_LIFE_TIME_SECONDS
         )
 
 
-async def login(*, session: async_sessionmaker[AsyncSession], payload: OAuth2PasswordRequestForm) -> str:
+async def login(*, session: AsyncSession, payload: OAuth2PasswordRequestForm) -> str:
     query = sa.select(User).where(User.phone_number == payload.username)
-    async with session.begin() as conn:
-        user: User | None = (await conn.scalar(query))
+    async with session.begin():
+        user: User | None = (await session.scalar(query))
     if not user:
         raise exceptions.UserNotFound
-    if not utils.verify_password(
+    if not await utils.verify_password(
         plain_password=payload.password, hashed_password=user.password
     ):
         raise exceptions.UserNotFound
@@ -91,43 +93,56 @@ async def login(*, session: async_sessionmaker[AsyncSession], payload: OAuth2Pas
     return utils.encode_access_token(user_id=user.id, user_rule=user.rule)
 
 
-async def verify_account(*, session: async_sessionmaker[AsyncSession], verification_code: str) -> None:
-    phone_number = get_redis_connection().get(
+async def verify_account(
+        *, session: AsyncSession, redis: Redis, verification_code: str
+) -> None:
+    phone_number = await redis.get(
         name=f"verification_code:{verification_code}"
     )
     if not phone_number:
         raise exceptions.InvalidVerificationCode
-    query = sa.update(User).where(User.phone_number==phone_number).values({User.is_active: True})
-    async with session.begin() as conn:
-        await conn.execute(query)
+    query = sa.update(User).where(User.phone_number==phone_number).values(
+        {User.is_active: True}
+    ).returning(User.id)
+    async with session.begin():
+        user_id: UserId | None = await session.scalar(query)
+    if user_id is not None:
+        await invalidate_user_state(redis=redis, user_id=user_id)
 
 
 async def change_password(
-        *, session: async_sessionmaker[AsyncSession], user: User, payload: schemas.ChangePasswordIn 
+        *, session: AsyncSession, user: User, payload: schemas.ChangePasswordIn 
 ) -> None: 
-    if not utils.verify_password(
-        plain_password=str(payload.old_password), hashed_password=user.password
+    # The authenticated user comes from the state cache without the password
+    password_query = sa.select(User.password).where(User.id==user.id)
+    async with session.begin():
+        hashed_password: str = await session.scalar(password_query) # type: ignore
+    if not await utils.verify_password(
+        plain_password=str(payload.old_password), hashed_password=hashed_password
     ):
         raise exceptions.WrongOldPassword
-    new_hashed_password = utils.get_password_hash(payload.new_password)
-    query = sa.update(User).where(User.password==user.password).values(
+    new_hashed_password = await utils.get_password_hash(payload.new_password)
+    query = sa.update(User).where(
+        sa.and_(User.id==user.id, User.password==hashed_password)
+    ).values(
         {
             User.password: new_hashed_password
         }
     )
-    async with session.begin() as conn:
-        await conn.execute(query)
+    async with session.begin():
+        await session.execute(query)
 
 
 async def reset_password(
-        *, session: async_sessionmaker[AsyncSession], phone_number: PhoneNumber, random_password: str
+        *, session: AsyncSession, redis: Redis,
+        phone_number: PhoneNumber, random_password: str
 ) -> bool:
     query = sa.select(User).where(User.phone_number==phone_number)
-    async with session.begin() as conn:
-        user: User | None = (await conn.scalar(query))
+    async with session.begin():
+        user: User | None = (await session.scalar(query))
     if user is None:
         raise exceptions.UserNotFound
-    get_redis_connection().set(
+    await redis.set(
         name=f"reset_password:{random_password}",
         value=phone_number,
         ex=auth_config.RANDOM_PASSWORD_LIFE_TIME_SECONDS
@@ -136,16 +151,16 @@ async def reset_password(
 
 
 async def verify_reset_password(
-        *, session: async_sessionmaker[AsyncSession], random_password: Password
+        *, session: AsyncSession, redis: Redis, random_password: Password
 ) -> None:
-    phone_number = get_redis_connection().get(
+    phone_number = await redis.get(
         name=f"reset_password:{random_password}"
     )
     if not phone_number:
         raise exceptions.InvalidRandomPassword
-    new_hashed_password = utils.get_password_hash(random_password)
+    new_hashed_password = await utils.get_password_hash(random_password)
     query = sa.update(User).where(User.phone_number==phone_number).values({
         User.password: new_hashed_password
     })
-    async with session.begin() as conn:
-        await conn.execute(query)
+    async with session.begin():
+        await session.execute(query)
@@ -1,6 +1,10 @@
 import jwt
+import time
+import asyncio
 
 from uuid import uuid4
+from typing import Any, Callable
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext # type: ignore
 from datetime import timedelta, datetime, timezone
 
@@ -11,7 +15,16 @@ secret_key = auth_config.SECRET_KEY
 access_token_life_time = auth_config.ACCESS_TOKEN_EXPIRE_MINUTES
 algorithm = auth_config.JWT_ALGORITHM
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=auth_config.BCRYPT_ROUNDS
+)
+
+# bcrypt releases the GIL, so hashing in threads keeps the event loop free
+hashing_executor = ThreadPoolExecutor(
+    max_workers=auth_config.PASSWORD_HASHING_CONCURRENCY, thread_name_prefix="password-hashing"
+)
+hashing_semaphore = asyncio.Semaphore(auth_config.PASSWORD_HASHING_CONCURRENCY)
+password_hashing_stats: dict[str, float] = {"waiting": 0, "running": 0, "count": 0, "sum": 0.0}
 
 
 def generate_random_code(num: int = 6) -> str:
@@ -22,12 +35,33 @@ def generate_random_code(num: int = 6) -> str:
     return uuid4().hex[:num]
 
 
-def get_password_hash(password: Password) -> str:
-    return pwd_context.hash(password)
+async def _run_hashing(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Runs a bcrypt call in the hashing pool, at most
+    PASSWORD_HASHING_CONCURRENCY calls run at once.
+    """
+    password_hashing_stats["waiting"] += 1
+    try:
+        await hashing_semaphore.acquire()
+    finally:
+        password_hashing_stats["waiting"] -= 1
+    password_hashing_stats["running"] += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(hashing_executor, func, *args)
+    finally:
+        password_hashing_stats["running"] -= 1
+        password_hashing_stats["count"] += 1
+        password_hashing_stats["sum"] += time.perf_counter() - start
+        hashing_semaphore.release()
+
+
+async def get_password_hash(password: Password) -> str:
+    return await _run_hashing(pwd_context.hash, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(pwd_context.verify, plain_password, hashed_password)
 
 
 def encode_access_token(user_id: UserId, user_rule: str) -> str:
@@ -0,0 +1,182 @@
+import math
+import time
+import random
+import asyncio
+import logging
+import orjson
+
+from typing import Any, Awaitable, Callable, NamedTuple
+from redis.asyncio import Redis
+from redis.asyncio.lock import Lock
+from redis.commands.core import AsyncScript
+from redis.exceptions import LockError
+
+from src.config import settings
+
+logger = logging.getLogger("root")
+
+# Stores the entry unless the key was invalidated while it was loading
+STORE_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+_store: AsyncScript | None = None
+# Background refreshes, referenced until they finish
+_refreshes: set[asyncio.Task] = set()
+
+
+class Uncached(NamedTuple):
+    """
+    Returned by a loader whose value is served but not stored,
+    like a fallback used while the real source is unavailable.
+    """
+    value: Any
+
+
+def _generation_key(key: str) -> str:
+    return f"{key}:generation"
+
+
+async def current_generation(redis: Redis, key: str) -> str:
+    """
+    Read before loading a value and passed to store with it.
+    """
+    return await redis.get(name=_generation_key(key)) or "0"
+
+
+async def store(redis: Redis, key: str, value: str | bytes, ex: int, generation: str) -> bool:
+    """
+    Sets key unless it was invalidated after generation was read.
+    """
+    global _store
+    if _store is None:
+        _store = redis.register_script(STORE_SCRIPT)
+    return bool(await _store(keys=[key, _generation_key(key)], args=[generation, value, ex], client=redis))
+
+
+async def invalidate(redis: Redis, *keys: str) -> None:
+    """
+    Deletes the entries, loads which started before are not stored.
+    """
+    async with redis.pipeline(transaction=True) as pipe:
+        for key in keys:
+            pipe.delete(key)
+            pipe.incr(_generation_key(key))
+        await pipe.execute()
+
+
+def _loads(cached_data: str | None) -> dict | None:
+    if cached_data is None:
+        return None
+    entry = orjson.loads(cached_data)
+    if not isinstance(entry, dict) or "value" not in entry:
+        return None
+    return entry
+
+
+async def _load_and_store(
+        redis: Redis, key: str, loader: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int
+) -> tuple[Any, bool]:
+    """
+    The loaded value and whether an invalidation rejected it.
+    """
+    generation = await current_generation(redis=redis, key=key)
+    start = time.time()
+    value = await loader()
+    if isinstance(value, Uncached):
+        return value.value, False
+    now = time.time()
+    entry = {"value": value, "delta": now - start, "expires_at": now + ttl}
+    stored = await store(
+        redis=redis, key=key, value=orjson.dumps(entry), ex=ttl + stale_ttl, generation=generation
+    )
+    return value, not stored
+
+
+async def _load_locked(
+        redis: Redis, key: str, loader: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int, lock: Lock
+) -> Any:
+    """
+    Loads as the lock holder, once more when an invalidation
+    rejected the value so the waiters find an entry.
+    """
+    try:
+        value, rejected = await _load_and_store(redis=redis, key=key, loader=loader, ttl=ttl, stale_ttl=stale_ttl)
+        if rejected:
+            value, _ = await _load_and_store(redis=redis, key=key, loader=loader, ttl=ttl, stale_ttl=stale_ttl)
+        return value
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            pass
+
+
+async def _refresh(
+        redis: Redis, key: str, loader: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int, lock: Lock
+) -> None:
+    try:
+        await _load_and_store(redis=redis, key=key, loader=loader, ttl=ttl, stale_ttl=stale_ttl)
+    except Exception:
+        logger.exception("Couldn't refresh cache key %s!", key)
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            pass
+
+
+def _should_refresh(entry: dict, beta: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch), the closer the entry is to
+    expiring and the slower it was to compute the likelier a refresh is.
+    """
+    return time.time() - entry["delta"] * beta * math.log(1 - random.random()) >= entry["expires_at"]
+
+
+async def get_or_load(
+        redis: Redis, key: str, loader: Callable[[], Awaitable[Any]], *,
+        ttl: int, stale_ttl: int | None = None, beta: float = 1.0
+) -> Any:
+    """
+    Cached result of loader, which must return orjson serializable data
+    or wrap it in Uncached.
+    Only the caller holding the key lock runs loader, expired entries are
+    served for stale_ttl more seconds while it refreshes them in the
+    background and callers missing the key wait for it to be stored,
+    one of them takes the lock over when the holder fails.
+    """
+    if stale_ttl is None:
+        stale_ttl = settings.CACHE_STALE_SECONDS
+    entry = _loads(await redis.get(name=key))
+    if entry is not None and not _should_refresh(entry, beta):
+        return entry["value"]
+
+    lock = redis.lock(name=f"{key}:lock", timeout=settings.CACHE_LOCK_SECONDS)
+    if entry is not None:
+        if await lock.acquire(blocking=False):
+            task = asyncio.create_task(_refresh(
+                redis=redis, key=key, loader=loader, ttl=ttl, stale_ttl=stale_ttl, lock=lock
+            ))
+            _refreshes.add(task)
+            task.add_done_callback(_refreshes.discard)
+        return entry["value"]
+
+    if await lock.acquire(blocking=False):
+        return await _load_locked(redis=redis, key=key, loader=loader, ttl=ttl, stale_ttl=stale_ttl, lock=lock)
+    deadline = time.monotonic() + settings.CACHE_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(settings.CACHE_WAIT_INTERVAL_SECONDS)
+        entry = _loads(await redis.get(name=key))
+        if entry is not None:
+            return entry["value"]
+        # The lock holder failed or its value was rejected, one waiter takes over
+        if await lock.acquire(blocking=False):
+            return await _load_locked(redis=redis, key=key, loader=loader, ttl=ttl, stale_ttl=stale_ttl, lock=lock)
+    # The lock holder took too long
+    value, _ = await _load_and_store(redis=redis, key=key, loader=loader, ttl=ttl, stale_ttl=stale_ttl)
+    return value
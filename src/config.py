@@ -1,7 +1,7 @@
 from typing import Any
 from dotenv import load_dotenv
 
-from pydantic import BaseModel, PostgresDsn
+from pydantic import BaseModel, PostgresDsn, PositiveInt
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from src.constants import Environment # type: ignore
@@ -17,8 +17,19 @@ class CustomBaseSettings(BaseSettings):
 class Config(CustomBaseSettings):
     POSTGRES_ASYNC_URL: PostgresDsn
     POSTGRES_TEST_URL: PostgresDsn
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_UNIQUE_PREPARED_STATEMENT_NAMES: bool = False
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT: float = 5
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5
     ENVIRONMENT: Environment = Environment.PRODUCTION
     APP_VERSION: str = "0.1"
     BUCKET_NAME: str
@@ -26,8 +37,26 @@ class Config(CustomBaseSettings):
     STORAGE_ACCESS_KEY: str
     STORAGE_SECRET_KEY: str
     S3_API: str
-    REQUEST_PER_HOUR: int
-    REQUEST_PER_DAY: int
+    S3_MAX_POOL_CONNECTIONS: int = 20
+    S3_UPLOAD_CONCURRENCY: int = 8
+    S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024
+    S3_PRESIGNED_URL_EXPIRES_SECONDS: int = 900
+    REQUEST_PER_HOUR: PositiveInt
+    REQUEST_PER_DAY: PositiveInt
+    LOGIN_REQUESTS_PER_MINUTE: PositiveInt = 10
+    REGISTER_REQUESTS_PER_HOUR: PositiveInt = 5
+    RESET_PASSWORD_REQUESTS_PER_HOUR: PositiveInt = 5
+    CREATE_TICKET_REQUESTS_PER_HOUR: PositiveInt = 5
+    PRESIGNED_UPLOAD_REQUESTS_PER_HOUR: PositiveInt = 30
+    PAGINATION_COUNT_CACHE_SECONDS: int = 10
+    CACHE_STALE_SECONDS: int = 600
+    CACHE_LOCK_SECONDS: int = 10
+    CACHE_WAIT_INTERVAL_SECONDS: float = 0.05
+    HTTP_TIMEOUT_SECONDS: float = 10
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 3
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_RETRIES: int = 2
 
 
 settings = Config() # type: ignore
@@ -75,6 +104,10 @@ class LogConfig(BaseModel):
         'payment': {
             'handlers': ['file', 'console'],
             'propagate': False,
+        },
+        'advertisement': {
+            'handlers': ['file', 'console'],
+            'propagate': False,
         }
     }
 
@@ -8,6 +8,8 @@ DB_NAMING_CONVENTION = {
     "pk": "pk_%(table_name)s",
 }
 
+POSTGRES_EXTENSIONS = ("pg_trgm", "cube", "earthdistance")
+
 
 class Environment(str, Enum):
     LOCAL = "LOCAL"
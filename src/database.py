@@ -1,12 +1,19 @@
+import time
+
+from uuid import uuid4
 from functools import lru_cache
-from redis import Redis
+from typing import AsyncGenerator, Any
+from redis.asyncio import Redis, ConnectionPool
 from datetime import datetime
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, DDL, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+from sqlalchemy.sql.expression import Executable, ClauseElement
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.types import DateTime, INTEGER, String, UUID, Numeric, ARRAY
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, async_sessionmaker, AsyncSession
 
-from src.constants import DB_NAMING_CONVENTION
+from src.constants import DB_NAMING_CONVENTION, POSTGRES_EXTENSIONS
 from src.config import settings
 from src.auth import types as auth_types
 from src.advertisement import types as advertisement_types
@@ -14,7 +21,45 @@ from src.tickets import types as ticket_types
 
 POSTGRES_URL = str(settings.POSTGRES_ASYNC_URL)
 
-engine: AsyncEngine = create_async_engine(POSTGRES_URL)
+pool_wait_stats: dict[str, float] = {"count": 0, "sum": 0.0, "max": 0.0}
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool which records how long each checkout
+    waited for a connection (queue wait, connect and pre ping).
+    """
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            waited = time.perf_counter() - start
+            pool_wait_stats["count"] += 1
+            pool_wait_stats["sum"] += waited
+            pool_wait_stats["max"] = max(pool_wait_stats["max"], waited)
+
+
+connect_args: dict[str, Any] = {
+    "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+}
+if settings.DB_UNIQUE_PREPARED_STATEMENT_NAMES:
+    # Needed behind pgbouncer in transaction mode
+    connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+
+engine: AsyncEngine = create_async_engine(
+    POSTGRES_URL,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=connect_args,
+)
+
+session_factory: async_sessionmaker[AsyncSession] = async_sessionmaker(engine, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -26,7 +71,6 @@ class Base(DeclarativeBase):
         advertisement_types.AdvertisementId: UUID,
         advertisement_types.CategoryId: INTEGER,
         advertisement_types.Price: Numeric,
-        advertisement_types.CalendarId: INTEGER,
         advertisement_types.AdvertisementImageId: INTEGER,
         ticket_types.TicketId: INTEGER,
         list[float]: ARRAY(item_type=Numeric),
@@ -34,16 +78,71 @@ class Base(DeclarativeBase):
     }
 
 
+for extension in POSTGRES_EXTENSIONS:
+    event.listen(Base.metadata, "before_create", DDL(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+
+
+class Explain(Executable, ClauseElement):
+    """
+    `EXPLAIN (FORMAT JSON)` of a statement, keeps the
+    statement bind parameters.
+    """
+    inherit_cache = False
+
+    def __init__(self, statement: Executable) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler, **kw) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
 @lru_cache
 def get_engine() -> AsyncEngine:
     return engine
 
 
-async def get_session() -> async_sessionmaker[AsyncSession]:
-    return async_sessionmaker(engine, expire_on_commit=False)
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Request scoped session, every dependency and
+    service in a request shares the same session.
+    """
+    async with session_factory() as session:
+        yield session
+
+
+redis_pool: ConnectionPool | None = None
+
+
+def get_redis_pool() -> ConnectionPool:
+    """
+    Returns the app-wide redis connection pool,
+    creating it on first use.
+    """
+    global redis_pool
+    if redis_pool is None:
+        redis_pool = ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+            decode_responses=True
+        )
+    return redis_pool
+
+
+async def close_redis_pool() -> None:
+    global redis_pool
+    if redis_pool is not None:
+        await redis_pool.aclose()
+        redis_pool = None
 
 
 def get_redis_connection() -> Redis:
-    return Redis(
-        host=settings.REDIS_HOST, port=settings.REDIS_PORT, decode_responses=True
-    )
\ No newline at end of file
+    return Redis(connection_pool=get_redis_pool())
+
+
+async def get_redis() -> Redis:
+    return get_redis_connection()
\ No newline at end of file
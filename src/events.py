@@ -0,0 +1,33 @@
+import logging
+
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, TypeVar
+
+logger = logging.getLogger("root")
+
+E = TypeVar("E")
+
+_handlers: dict[type, list[Callable[[Any], Awaitable[None]]]] = defaultdict(list)
+
+
+def subscribe(event_type: type[E]) -> Callable[[Callable[[E], Awaitable[None]]], Callable[[E], Awaitable[None]]]:
+    """
+    Registers the decorated coroutine function as a handler of event_type.
+    """
+    def decorator(handler: Callable[[E], Awaitable[None]]) -> Callable[[E], Awaitable[None]]:
+        _handlers[event_type].append(handler)
+        return handler
+    return decorator
+
+
+async def publish(event: Any) -> None:
+    """
+    Runs the handlers of the event in the current process. Publish after
+    the change is committed, a failed handler is logged and doesn't fail
+    the caller.
+    """
+    for handler in _handlers[type(event)]:
+        try:
+            await handler(event)
+        except Exception:
+            logger.exception("Handler %s of %s failed!", handler.__name__, type(event).__name__)
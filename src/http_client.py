@@ -0,0 +1,30 @@
+import httpx
+
+from src.config import settings
+
+http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the app-wide http client, creating it on first use
+    so connections to external services are pooled.
+    """
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS
+            ),
+            limits=httpx.Limits(max_connections=settings.HTTP_MAX_CONNECTIONS),
+            # Retries failed connection attempts, not failed responses
+            transport=httpx.AsyncHTTPTransport(retries=settings.HTTP_RETRIES)
+        )
+    return http_client
+
+
+async def close_http_client() -> None:
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from logging.config import dictConfig
 
@@ -8,11 +9,23 @@ from contextlib import asynccontextmanager
 
 
 from src.config import LogConfig, app_configs
+from src.database import get_redis_pool, close_redis_pool, get_redis_connection, session_factory
+from src.tasks import start_periodic_task, stop_periodic_task
+from src.s3.utils import close_s3_client
+from src.http_client import close_http_client
+from src.advertisement.config import advertisement_settings
+from src.advertisement.views import flush_views
+from src.advertisement.media import collect_orphan_media, reconcile_media
+from src.advertisement.images import start_image_process_pool, close_image_process_pool
+from src.advertisement.categories import listen_for_category_changes
+from src.advertisement import handlers as advertisement_handlers # noqa: F401
 from src.auth import router as auth_router
+from src.auth.utils import hashing_executor
 from src.advertisement import router as advertisement_router
 from src.admin import router as admin_router
 from src.payment import router as payment_router
 from src.tickets import router as ticket_router
+from src.monitoring import router as monitoring_router
 
 logger = logging.getLogger("root")
 
@@ -20,8 +33,39 @@ logger = logging.getLogger("root")
 @asynccontextmanager
 async def lifespan(_application: FastAPI) -> AsyncGenerator:
     dictConfig(LogConfig().model_dump())
+    get_redis_pool()
+    start_image_process_pool()
+
+    async def flush_advertisement_views() -> None:
+        await flush_views(redis=get_redis_connection(), session_factory=session_factory)
+
+    async def collect_advertisement_media() -> None:
+        await collect_orphan_media(redis=get_redis_connection(), session_factory=session_factory)
+
+    async def reconcile_advertisement_media() -> None:
+        await reconcile_media(redis=get_redis_connection(), session_factory=session_factory)
+
+    periodic_tasks = [
+        start_periodic_task(advertisement_settings.VIEWS_FLUSH_INTERVAL_SECONDS, flush_advertisement_views),
+        start_periodic_task(advertisement_settings.MEDIA_GC_INTERVAL_SECONDS, collect_advertisement_media),
+        start_periodic_task(
+            advertisement_settings.MEDIA_GC_RECONCILE_INTERVAL_SECONDS, reconcile_advertisement_media
+        ),
+    ]
+    category_listener = asyncio.create_task(listen_for_category_changes(get_redis_connection()))
     logger.info("App is running...")
     yield
+    for task in [*periodic_tasks, category_listener]:
+        await stop_periodic_task(task)
+    try:
+        await flush_advertisement_views()
+    except Exception:
+        logger.exception("Couldn't flush advertisement views on shutdown!")
+    await close_redis_pool()
+    hashing_executor.shutdown(wait=True)
+    await close_s3_client()
+    await close_http_client()
+    close_image_process_pool()
 
 
 app = FastAPI(**app_configs, lifespan=lifespan)
@@ -44,3 +88,4 @@ app.include_router(router=advertisement_router.router, prefix="/advertisement",
 app.include_router(router=admin_router.router, prefix="/admin", tags=["admin"])
 app.include_router(router=payment_router.router, prefix="/payment", tags=["payment"])
 app.include_router(router=ticket_router.router, prefix="/tickets", tags=["tickets"])
+app.include_router(router=monitoring_router.router, prefix="/metrics", tags=["monitoring"])
@@ -0,0 +1,23 @@
+from typing import Annotated, Literal
+from fastapi import APIRouter, status, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.database import get_engine
+from src.monitoring import service
+from src.auth.dependencies import is_admin
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse,
+    include_in_schema=False
+)
+async def metrics(
+    is_admin: Annotated[Literal[True], Depends(is_admin)],
+    engine: Annotated[AsyncEngine, Depends(get_engine)]
+) -> str:
+    return service.render_metrics(engine)
@@ -0,0 +1,65 @@
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from src.database import pool_wait_stats
+from src.auth.utils import password_hashing_stats
+
+
+def _metric(name: str, metric_type: str, value: float, help_text: str) -> list[str]:
+    return [
+        f"# HELP {name} {help_text}",
+        f"# TYPE {name} {metric_type}",
+        f"{name} {value}",
+    ]
+
+
+def database_pool_metrics(engine: AsyncEngine) -> list[str]:
+    """
+    Pool gauges of the current worker process in
+    prometheus text format.
+    """
+    lines: list[str] = []
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        lines += _metric("db_pool_size", "gauge", pool.size(), "Configured pool size.")
+        lines += _metric("db_pool_checked_in", "gauge", pool.checkedin(), "Idle connections in the pool.")
+        lines += _metric("db_pool_checked_out", "gauge", pool.checkedout(), "Connections in use.")
+        lines += _metric(
+            "db_pool_overflow", "gauge", max(pool.overflow(), 0), "Overflow connections in use."
+        )
+    lines += [
+        "# HELP db_pool_wait_seconds Time spent waiting for a connection checkout.",
+        "# TYPE db_pool_wait_seconds summary",
+        f"db_pool_wait_seconds_sum {pool_wait_stats['sum']}",
+        f"db_pool_wait_seconds_count {pool_wait_stats['count']}",
+    ]
+    lines += _metric(
+        "db_pool_wait_seconds_max", "gauge", pool_wait_stats["max"], "Longest checkout wait."
+    )
+    return lines
+
+
+def password_hashing_metrics() -> list[str]:
+    """
+    Queue depth and timing of the bcrypt worker pool.
+    """
+    lines: list[str] = []
+    lines += _metric(
+        "password_hashing_waiting", "gauge", password_hashing_stats["waiting"],
+        "Hashing calls queued for a worker."
+    )
+    lines += _metric(
+        "password_hashing_running", "gauge", password_hashing_stats["running"],
+        "Hashing calls running in the pool."
+    )
+    lines += [
+        "# HELP password_hashing_seconds Time spent hashing or verifying passwords.",
+        "# TYPE password_hashing_seconds summary",
+        f"password_hashing_seconds_sum {password_hashing_stats['sum']}",
+        f"password_hashing_seconds_count {password_hashing_stats['count']}",
+    ]
+    return lines
+
+
+def render_metrics(engine: AsyncEngine) -> str:
+    return "\n".join(database_pool_metrics(engine) + password_hashing_metrics()) + "\n"
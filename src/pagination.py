@@ -1,47 +1,215 @@
+import json
+import base64
+import hashlib
+import binascii
 import sqlalchemy as sa
 
-from fastapi import Query
-from sqlalchemy.ext.asyncio import AsyncEngine
-from pydantic import BaseModel
-from typing import TypeVar, Generic, Annotated
+from enum import Enum
+from uuid import UUID
+from decimal import Decimal
+from datetime import datetime, date
+from fastapi import Query, HTTPException, status
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+from pydantic import BaseModel, Field
+from typing import TypeVar, Generic, Annotated, Any, Sequence
+
+from src.config import settings
+from src.database import Explain
 
 T = TypeVar("T")
 
 
+class CountStrategy(str, Enum):
+    EXACT = "exact"
+    CACHED = "cached"
+    ESTIMATED = "estimated"
+    NONE = "none"
+
+
+class InvalidCursor(HTTPException):
+    def __init__(self) -> None:
+        self.status_code = status.HTTP_400_BAD_REQUEST
+        self.detail = "Invalid pagination cursor!"
+
+
 class PaginatedResponse(BaseModel, Generic[T]):
-    count: int
+    count: int | None
     items: list[T]
+    next_cursor: Annotated[str | None, Field(serialization_alias="nextCursor")] = None
 
 
 class PaginationQuerySchema(BaseModel):
     limit: int
     offset: int
+    cursor: str | None = None
+    count_strategy: CountStrategy = CountStrategy.EXACT
 
 
 async def pagination_query(
         page: Annotated[int, Query(ge=1)] = 1,
-        per_page: Annotated[int, Query(alias="per-page")] = 10
+        per_page: Annotated[int, Query(alias="per-page")] = 10,
+        cursor: Annotated[str | None, Query()] = None,
+        count_strategy: Annotated[CountStrategy | None, Query(alias="count")] = None
 ) -> PaginationQuerySchema:
     """
     Dependency for getting page and per_page from
     query parameters and convert them to limit offset.
+    When cursor is provided page is ignored and the
+    count is skipped unless it is asked for.
     """
     limit: int = per_page
     offset: int = (page - 1) * per_page
-    return PaginationQuerySchema(limit=limit, offset=offset)
+    if count_strategy is None:
+        count_strategy = CountStrategy.NONE if cursor else CountStrategy.EXACT
+    return PaginationQuerySchema(
+        limit=limit, offset=offset, cursor=cursor, count_strategy=count_strategy
+    )
+
+
+def _keyset_columns(keyset: Sequence[Any]) -> list[tuple[Any, bool]]:
+    """
+    Splits order by clauses like `Model.created_at.desc()`
+    into (column, descending) pairs.
+    """
+    columns = []
+    for clause in keyset:
+        if isinstance(clause, UnaryExpression) and clause.modifier in (operators.desc_op, operators.asc_op):
+            columns.append((clause.element, clause.modifier is operators.desc_op))
+        else:
+            columns.append((clause, False))
+    return columns
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _coerce_cursor_value(value: Any, column: Any) -> Any:
+    """
+    Parses a decoded value back into the python type of its column,
+    values of the wrong JSON type are rejected.
+    """
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    parsers = {datetime: datetime.fromisoformat, date: date.fromisoformat, UUID: UUID, Decimal: Decimal}
+    if python_type in parsers:
+        if not isinstance(value, str):
+            raise InvalidCursor
+        return parsers[python_type](value)
+    if python_type is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    # bool is an int subclass, neither is accepted for the other
+    if not isinstance(value, python_type) or isinstance(value, bool) is not (python_type is bool):
+        raise InvalidCursor
+    return value
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> list[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursor
+        return [_coerce_cursor_value(value, column) for value, column in zip(values, columns)]
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor
+
+
+def seek_predicate(columns: list[tuple[Any, bool]], values: Sequence[Any]) -> sa.ColumnElement[bool]:
+    """
+    Rows which come after the cursor row in the keyset order.
+    """
+    params = [sa.literal(value, type_=column.type) for (column, _), value in zip(columns, values)]
+    if len(set(descending for _, descending in columns)) == 1:
+        # Row value comparison can be answered with an index seek
+        left = sa.tuple_(*[column for column, _ in columns])
+        right = sa.tuple_(*params)
+        return left < right if columns[0][1] else left > right
+    conditions = []
+    for index, (column, descending) in enumerate(columns):
+        equals = [columns[i][0] == params[i] for i in range(index)]
+        after = column < params[index] if descending else column > params[index]
+        conditions.append(sa.and_(*equals, after))
+    return sa.or_(*conditions)
+
+
+async def _estimated_count(conn: AsyncConnection, query: sa.Select) -> int:
+    """
+    Row count the planner expects the query to return.
+    """
+    plan = (await conn.execute(Explain(query))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"]) # type: ignore
+
+
+def _count_cache_key(engine: AsyncEngine, count_query: sa.Select) -> str:
+    compiled = count_query.compile(dialect=engine.dialect)
+    raw = f"{compiled}:{json.dumps(compiled.params, default=str, sort_keys=True)}"
+    return f"pagination-count:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+async def _count(
+        conn: AsyncConnection, engine: AsyncEngine, redis: Redis | None,
+        query: sa.Select, count_strategy: CountStrategy
+) -> int | None:
+    if count_strategy is CountStrategy.NONE:
+        return None
+    if count_strategy is CountStrategy.ESTIMATED:
+        return await _estimated_count(conn, query)
+    count_query: sa.Select = sa.Select(sa.func.count()).select_from(query.subquery())
+    if count_strategy is CountStrategy.EXACT:
+        return (await conn.scalar(count_query)) # type: ignore
+    assert redis is not None, "Cached counts need redis!"
+    cache_key = _count_cache_key(engine, count_query)
+    cached_count = await redis.get(cache_key)
+    if cached_count is not None:
+        return int(cached_count)
+    count: int = await conn.scalar(count_query) # type: ignore
+    await redis.set(name=cache_key, value=count, ex=settings.PAGINATION_COUNT_CACHE_SECONDS)
+    return count
 
 
 async def paginate(
-        *, engine: AsyncEngine, query: sa.Select, limit: int, offset: int
+        *, engine: AsyncEngine, query: sa.Select, limit: int, offset: int,
+        cursor: str | None = None, keyset: Sequence[Any] | None = None,
+        count_strategy: CountStrategy = CountStrategy.EXACT, redis: Redis | None = None
 ) -> dict:
     """
     Helper function for pagination.
+    Queries with a keyset (order by clauses ending with a unique column)
+    also return next_cursor, passing it back as cursor seeks past the
+    last returned row instead of using OFFSET.
+    count_strategy picks between an exact count, an exact count cached
+    for a few seconds per filter in redis, the planner estimate or no count.
     """
-    count_query: sa.Select = sa.Select(sa.func.count()).select_from(query.subquery())
-    paginated_query: sa.Select = query.limit(limit).offset(offset)
+    next_cursor = None
+    if keyset:
+        columns = _keyset_columns(keyset)
+        paginated_query: sa.Select = query.order_by(None).order_by(*keyset).add_columns(
+            *[column.label(f"cursor_{index}") for index, (column, _) in enumerate(columns)]
+        )
+        if cursor:
+            values = decode_cursor(cursor, [column for column, _ in columns])
+            paginated_query = paginated_query.where(seek_predicate(columns, values)).limit(limit)
+        else:
+            paginated_query = paginated_query.limit(limit).offset(offset)
+    else:
+        paginated_query = query.limit(limit).offset(offset)
     async with engine.begin() as conn:
         result = {
-            "count": ((await conn.execute(count_query)).first())[0], # type: ignore
+            "count": await _count(conn, engine, redis, query, count_strategy),
             "items": (await conn.execute(paginated_query)).all()
         }
+    if keyset and len(result["items"]) == limit:
+        last_row = result["items"][-1]._mapping
+        next_cursor = encode_cursor([last_row[f"cursor_{index}"] for index in range(len(keyset))])
+    result["next_cursor"] = next_cursor
     return result
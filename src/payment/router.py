@@ -1,8 +1,9 @@
 from typing import Annotated
 from fastapi import APIRouter, status, Depends
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database import get_session
+from src.database import get_session, get_redis
 from src.payment import service
 from src.auth.dependencies import get_current_active_user
 from src.auth.models import User
@@ -16,6 +17,7 @@ router = APIRouter()
 )
 async def add_subscription_fee(
     current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)],
+    redis: Annotated[Redis, Depends(get_redis)]
 ):
-    await service.add_subscription_fee(session=session, user=current_user)
\ No newline at end of file
+    await service.add_subscription_fee(session=session, redis=redis, user=current_user)
\ No newline at end of file
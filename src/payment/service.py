@@ -1,16 +1,18 @@
 import logging
 import sqlalchemy as sa
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.payment import exceptions
 from src.auth.models import User
+from src.auth.cache import invalidate_user_state
 
 logger = logging.getLogger("payment")
 
 
 async def add_subscription_fee(
-        session: async_sessionmaker[AsyncSession], user: User
+        session: AsyncSession, redis: Redis, user: User
 ) -> None:
     if user.has_subscription_fee:
         raise exceptions.AlreadyPaid
@@ -19,6 +21,7 @@ async def add_subscription_fee(
             User.has_subscription_fee: True
         }
     )
-    async with session.begin() as conn:
-        await conn.execute(query)
+    async with session.begin():
+        await session.execute(query)
+    await invalidate_user_state(redis=redis, user_id=user.id)
     logger.info("Paid subscription fee.")
@@ -0,0 +1,123 @@
+import math
+
+from uuid import uuid4
+from typing import Annotated, Awaitable, Callable, NamedTuple, Sequence
+from fastapi import Depends, HTTPException, Request, status
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+from src.database import get_redis
+from src.auth.models import User
+from src.auth.dependencies import get_current_active_user
+
+RATE_LIMIT_KEY_PREFIX = "rate-limit"
+
+# Sliding window log, one sorted set of request timestamps per window.
+# KEYS are the windows, ARGV[1] is the member of this request followed
+# by the limit and the window milliseconds of each key. Every window is
+# checked before any of them records the request, returns 0 when the
+# request is allowed and otherwise milliseconds until it would be.
+SLIDING_WINDOW_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[i * 2 + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    if count >= limit then
+        local oldest = redis.call('ZRANGE', key, count - limit, count - limit, 'WITHSCORES')
+        retry_after = math.max(retry_after, tonumber(oldest[2]) + window - now)
+    end
+end
+if retry_after > 0 then
+    return retry_after
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[1])
+    redis.call('PEXPIRE', key, ARGV[i * 2 + 1])
+end
+return 0
+"""
+
+_sliding_window: AsyncScript | None = None
+
+
+class RateLimit(NamedTuple):
+    limit: int
+    seconds: int
+
+
+class RateLimitExceeded(HTTPException):
+    def __init__(self, retry_after: int) -> None:
+        self.status_code = status.HTTP_429_TOO_MANY_REQUESTS
+        self.detail = f"Too many requests, try again in {retry_after} seconds!"
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+def rate_limit_key(scope: str, identifier: str, seconds: int) -> str:
+    return f"{RATE_LIMIT_KEY_PREFIX}:{scope}:{identifier}:{seconds}"
+
+
+async def hit(redis: Redis, scope: str, identifier: str, limits: Sequence[RateLimit]) -> int:
+    """
+    Records a request when every limit allows it, in one round trip.
+    Returns 0 or the seconds to wait before retrying.
+    """
+    global _sliding_window
+    if _sliding_window is None:
+        # Runs with EVALSHA, the script is only sent again after a SCRIPT FLUSH
+        _sliding_window = redis.register_script(SLIDING_WINDOW_SCRIPT)
+    args: list[str | int] = [uuid4().hex]
+    for limit in limits:
+        args.extend([limit.limit, limit.seconds * 1000])
+    retry_after_ms = await _sliding_window(
+        keys=[rate_limit_key(scope, identifier, limit.seconds) for limit in limits],
+        args=args, client=redis
+    )
+    return math.ceil(int(retry_after_ms) / 1000)
+
+
+def _validate(limits: Sequence[RateLimit]) -> None:
+    """
+    A zero limit or window would make the script fail on every request.
+    """
+    if not limits:
+        raise ValueError("At least one rate limit is required!")
+    for limit in limits:
+        if limit.limit < 1 or limit.seconds < 1:
+            raise ValueError(f"Rate limit and window must be at least 1, got {limit}!")
+
+
+async def _check(redis: Redis, scope: str, identifier: str, limits: Sequence[RateLimit]) -> None:
+    retry_after = await hit(redis=redis, scope=scope, identifier=identifier, limits=limits)
+    if retry_after:
+        raise RateLimitExceeded(retry_after)
+
+
+def limit_by_ip(scope: str, *limits: RateLimit) -> Callable[..., Awaitable[None]]:
+    """
+    Dependency limiting the requests of each client address.
+    """
+    _validate(limits)
+    async def dependency(
+            request: Request,
+            redis: Annotated[Redis, Depends(get_redis)]
+    ) -> None:
+        host = request.client.host if request.client else "unknown"
+        await _check(redis=redis, scope=scope, identifier=host, limits=limits)
+    return dependency
+
+
+def limit_by_user(scope: str, *limits: RateLimit) -> Callable[..., Awaitable[None]]:
+    """
+    Dependency limiting the requests of each active user.
+    """
+    _validate(limits)
+    async def dependency(
+            user: Annotated[User, Depends(get_current_active_user)],
+            redis: Annotated[Redis, Depends(get_redis)]
+    ) -> None:
+        await _check(redis=redis, scope=scope, identifier=str(user.id), limits=limits)
+    return dependency
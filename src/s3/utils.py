@@ -1,32 +1,173 @@
-from typing import BinaryIO
+import asyncio
+
+from typing import Any, BinaryIO, AsyncGenerator
+from contextlib import AsyncExitStack
+from aiobotocore.config import AioConfig # type: ignore
 from aiobotocore.session import get_session # type: ignore
+from botocore.exceptions import ClientError # type: ignore
 
 from src.config import settings
 
+# DeleteObjects accepts at most this many keys per request
+DELETE_OBJECTS_BATCH_SIZE = 1000
+
+s3_exit_stack: AsyncExitStack | None = None
+s3_client: Any = None
+s3_client_lock = asyncio.Lock()
+
+
+async def get_s3_client() -> Any:
+    """
+    Returns the app-wide S3 client, creating it on first use
+    so its connections (and TLS sessions) are reused.
+    """
+    global s3_client, s3_exit_stack
+    async with s3_client_lock:
+        if s3_client is None:
+            s3_exit_stack = AsyncExitStack()
+            s3_client = await s3_exit_stack.enter_async_context(
+                get_session().create_client(
+                    "s3",
+                    endpoint_url=settings.S3_ENDPOINT,
+                    aws_access_key_id=settings.STORAGE_ACCESS_KEY,
+                    aws_secret_access_key=settings.STORAGE_SECRET_KEY,
+                    config=AioConfig(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS)
+                )
+            )
+    return s3_client
+
+
+async def close_s3_client() -> None:
+    global s3_client, s3_exit_stack
+    async with s3_client_lock:
+        if s3_exit_stack is not None:
+            await s3_exit_stack.aclose()
+        s3_client = None
+        s3_exit_stack = None
+
+
+def _file_size(file: BinaryIO) -> int:
+    position = file.tell()
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+async def _multipart_upload(client: Any, file: BinaryIO, unique_filename: str) -> None:
+    """
+    Streams the file in S3_MULTIPART_CHUNK_SIZE parts
+    instead of holding the whole body for one request.
+    """
+    upload = await client.create_multipart_upload(
+        Bucket=settings.BUCKET_NAME, Key=unique_filename
+    )
+    upload_id = upload["UploadId"]
+    parts = []
+    try:
+        part_number = 1
+        while chunk := await asyncio.to_thread(file.read, settings.S3_MULTIPART_CHUNK_SIZE):
+            part = await client.upload_part(
+                Bucket=settings.BUCKET_NAME, Key=unique_filename,
+                UploadId=upload_id, PartNumber=part_number, Body=chunk
+            )
+            parts.append({"ETag": part["ETag"], "PartNumber": part_number})
+            part_number += 1
+        await client.complete_multipart_upload(
+            Bucket=settings.BUCKET_NAME, Key=unique_filename,
+            UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except Exception:
+        await client.abort_multipart_upload(
+            Bucket=settings.BUCKET_NAME, Key=unique_filename, UploadId=upload_id
+        )
+        raise
+
 
 async def upload_to_s3(file: BinaryIO, unique_filename: str):
-    session = get_session()
-    async with session.create_client(
-        "s3",
-        endpoint_url=settings.S3_ENDPOINT,
-        aws_access_key_id=settings.STORAGE_ACCESS_KEY,
-        aws_secret_access_key=settings.STORAGE_SECRET_KEY,
-    ) as client:
-        await client.put_object(
+    client = await get_s3_client()
+    file.seek(0)
+    if _file_size(file) > settings.S3_MULTIPART_THRESHOLD:
+        await _multipart_upload(client, file, unique_filename)
+        return
+    await client.put_object(
+        Bucket=settings.BUCKET_NAME,
+        Key=unique_filename,
+        Body=file
+    )
+
+
+async def upload_many_to_s3(files: dict[str, BinaryIO]) -> None:
+    """
+    Uploads {unique_filename: file} concurrently,
+    at most S3_UPLOAD_CONCURRENCY files at once.
+    """
+    semaphore = asyncio.Semaphore(settings.S3_UPLOAD_CONCURRENCY)
+
+    async def upload(unique_filename: str, file: BinaryIO) -> None:
+        async with semaphore:
+            await upload_to_s3(file=file, unique_filename=unique_filename)
+
+    await asyncio.gather(
+        *[upload(unique_filename, file) for unique_filename, file in files.items()]
+    )
+
+
+async def generate_presigned_put(key: str, content_type: str, size: int) -> str:
+    """
+    URL the client can PUT the file to directly, the content
+    type and length are part of the signature.
+    """
+    client = await get_s3_client()
+    return await client.generate_presigned_url(
+        "put_object",
+        Params={
+            "Bucket": settings.BUCKET_NAME, "Key": key,
+            "ContentType": content_type, "ContentLength": size
+        },
+        ExpiresIn=settings.S3_PRESIGNED_URL_EXPIRES_SECONDS
+    )
+
+
+async def head_s3_object(key: str) -> dict | None:
+    client = await get_s3_client()
+    try:
+        return await client.head_object(Bucket=settings.BUCKET_NAME, Key=key)
+    except ClientError as error:
+        if error.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+async def delete_from_s3(filename: str):
+    client = await get_s3_client()
+    await client.delete_object(
+        Bucket=settings.BUCKET_NAME, Key=filename
+    )
+
+
+async def delete_many_from_s3(filenames: list[str]) -> list[str]:
+    """
+    Deletes the keys with DeleteObjects in batches,
+    returns the keys which couldn't be deleted.
+    """
+    client = await get_s3_client()
+    failed: list[str] = []
+    for start in range(0, len(filenames), DELETE_OBJECTS_BATCH_SIZE):
+        batch = filenames[start:start + DELETE_OBJECTS_BATCH_SIZE]
+        response = await client.delete_objects(
             Bucket=settings.BUCKET_NAME,
-            Key=unique_filename,
-            Body=file
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
         )
+        failed += [error["Key"] for error in response.get("Errors", [])]
+    return failed
 
 
-async def delete_from_s3(filename: str):
-    session = get_session()
-    async with session.create_client(
-        "s3",
-        endpoint_url=settings.S3_ENDPOINT,
-        aws_access_key_id=settings.STORAGE_ACCESS_KEY,
-        aws_secret_access_key=settings.STORAGE_SECRET_KEY,
-    ) as client:
-        await client.delete_object(
-            Bucket=settings.BUCKET_NAME, Key=filename
-        )
\ No newline at end of file
+async def list_s3_objects() -> AsyncGenerator[list[dict], None]:
+    """
+    Yields the objects of the bucket page by page.
+    """
+    client = await get_s3_client()
+    paginator = client.get_paginator("list_objects_v2")
+    async for page in paginator.paginate(Bucket=settings.BUCKET_NAME):
+        yield page.get("Contents", [])
@@ -0,0 +1,31 @@
+import asyncio
+import logging
+
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("root")
+
+
+async def run_periodically(interval: float, func: Callable[[], Awaitable]) -> None:
+    """
+    Runs func every interval seconds until cancelled,
+    errors are logged so one failed run doesn't stop the loop.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await func()
+        except Exception:
+            logger.exception("Periodic task %s failed!", getattr(func, "__name__", func))
+
+
+def start_periodic_task(interval: float, func: Callable[[], Awaitable]) -> asyncio.Task:
+    return asyncio.create_task(run_periodically(interval, func))
+
+
+async def stop_periodic_task(task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
@@ -8,6 +8,17 @@ from src.tickets.types import TicketId
 
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        sa.Index("ix_tickets_created_at_id", "created_at", "id"),
+        sa.Index(
+            "ix_tickets_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+        sa.Index(
+            "ix_tickets_email_trgm", "email",
+            postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}
+        ),
+    )
 
     id: so.Mapped[TicketId] = so.mapped_column(primary_key=True, autoincrement=True)
     name: so.Mapped[str] = so.mapped_column(sa.String(250), index=True)
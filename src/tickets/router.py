@@ -1,9 +1,12 @@
 from fastapi import APIRouter, status, Depends, Query
 from typing import Annotated, Literal
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, AsyncEngine
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
 
 from src.pagination import PaginatedResponse, pagination_query, PaginationQuerySchema
-from src.database import get_engine, get_session
+from src.config import settings
+from src.database import get_engine, get_session, get_redis
+from src.rate_limit import RateLimit, limit_by_ip
 from src.tickets import schemas
 from src.tickets import service
 from src.auth.dependencies import is_admin
@@ -13,11 +16,14 @@ router = APIRouter()
 @router.post(
         "/create-ticket/",
         response_model=schemas.Ticket,
-        status_code=status.HTTP_201_CREATED
+        status_code=status.HTTP_201_CREATED,
+        dependencies=[Depends(limit_by_ip(
+            "create-ticket", RateLimit(settings.CREATE_TICKET_REQUESTS_PER_HOUR, 3600)
+        ))]
 )
 async def create_ticket(
     input_data: schemas.Ticket,
-    session: Annotated[async_sessionmaker[AsyncSession], Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)]
 ) -> schemas.Ticket:
     await service.add_ticket(input_data, session)
     return input_data
@@ -31,12 +37,14 @@ async def create_ticket(
 async def list_tickets(
     is_admin: Annotated[Literal[True], Depends(is_admin)],
     engine: Annotated[AsyncEngine, Depends(get_engine)],
+    redis: Annotated[Redis, Depends(get_redis)],
     pagination_info: Annotated[PaginationQuerySchema, Depends(pagination_query)],
     name__icontains: Annotated[str | None, Query(max_length=250, alias="nameIcontains")] = None,
     email__icontains: Annotated[str | None, Query(max_length=250, alias="emailIcontains")] = None
 ):
     response = await service.all_tickets(
-        engine=engine, limit=pagination_info.limit,
-        offset=pagination_info.offset, name=name__icontains, email=email__icontains
+        engine=engine, redis=redis, limit=pagination_info.limit,
+        offset=pagination_info.offset, cursor=pagination_info.cursor,
+        count_strategy=pagination_info.count_strategy, name=name__icontains, email=email__icontains
     )
     return response
\ No newline at end of file
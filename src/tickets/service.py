@@ -1,27 +1,28 @@
 import sqlalchemy as sa
 
-from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, AsyncSession
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
-from src.pagination import paginate
+from src.pagination import paginate, CountStrategy
 from src.tickets.models import Ticket
 from src.tickets.schemas import Ticket as TicketSchema
 
 
 async def add_ticket(
-        input_data: TicketSchema, session: async_sessionmaker[AsyncSession]
+        input_data: TicketSchema, session: AsyncSession
 ) -> None:
     query = sa.insert(Ticket).values({
         Ticket.name: input_data.name,
         Ticket.email: input_data.email,
         Ticket.message: input_data.message
     })
-    async with session.begin() as conn:
-        await conn.execute(query)
+    async with session.begin():
+        await session.execute(query)
 
 
 async def all_tickets(
-        *, engine: AsyncEngine, limit: int, offset: int,
-        name: str | None, email: str | None
+        *, engine: AsyncEngine, redis: Redis, limit: int, offset: int, cursor: str | None,
+        count_strategy: CountStrategy, name: str | None, email: str | None
 ) -> dict:
     query = sa.select(Ticket.email, Ticket.name, Ticket.message)
     if name:
@@ -30,6 +31,8 @@ async def all_tickets(
         query = query.where(Ticket.email.ilike(f"%{email}%"))
 
     result = await paginate(
-        engine=engine, query=query, limit=limit, offset=offset
+        engine=engine, query=query, limit=limit, offset=offset, cursor=cursor,
+        keyset=(Ticket.created_at.desc(), Ticket.id.desc()),
+        count_strategy=count_strategy, redis=redis
     )
     return result
\ No newline at end of file
@@ -0,0 +1,22 @@
+import pytest_asyncio
+
+from botocore.exceptions import ClientError # type: ignore
+
+from src.config import settings
+from src.s3.utils import get_s3_client, close_s3_client
+
+
+@pytest_asyncio.fixture
+async def bucket():
+    """
+    Runs against the S3_ENDPOINT storage, the local minio
+    service of docker-compose in development.
+    """
+    client = await get_s3_client()
+    try:
+        await client.create_bucket(Bucket=settings.BUCKET_NAME)
+    except ClientError as error:
+        if error.response["Error"]["Code"] not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+            raise
+    yield
+    await close_s3_client()
@@ -0,0 +1,64 @@
+import pytest
+
+from datetime import date, timedelta
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.pagination import CountStrategy
+from src.advertisement import service
+from src.database import get_redis_connection
+from src.advertisement import exceptions
+from src.advertisement.categories import bump_category_version
+from src.advertisement.utils import days_to_ranges, ranges_to_days
+from tests.conftest import Factory
+
+pytestmark = pytest.mark.asyncio
+
+FIRST_DAY = date(2030, 1, 10)
+
+
+async def seed(factory: Factory) -> str:
+    category = await factory.category()
+    # Available on the 10th to 14th and on the 16th
+    await factory.advertisement(
+        category=category, title="available", available_days=[
+            Range(FIRST_DAY, FIRST_DAY + timedelta(days=5)),
+            Range(FIRST_DAY + timedelta(days=6), FIRST_DAY + timedelta(days=7))
+        ]
+    )
+    await bump_category_version(get_redis_connection())
+    return category.name
+
+
+async def search(
+        db_engine: AsyncEngine, category_name: str, available_from: date | None, available_to: date | None
+) -> list[str]:
+    result = await service.get_published_advertisement(
+        engine=db_engine, redis=get_redis_connection(), limit=10, offset=0, cursor=None,
+        count_strategy=CountStrategy.NONE,
+        text__icontains=None, text_search=None, place__icontains=None, hour_price__range=None,
+        day_price__range=None, week_price__range=None, month_price__range=None,
+        category_name=category_name, available_from=available_from, available_to=available_to
+    )
+    return [item.title for item in result["items"]]
+
+
+async def test_availability_filter_requires_every_day(db_engine: AsyncEngine, factory: Factory):
+    category_name = await seed(factory)
+    assert await search(db_engine, category_name, FIRST_DAY, FIRST_DAY + timedelta(days=4)) == ["available"]
+    assert await search(db_engine, category_name, FIRST_DAY + timedelta(days=6), None) == ["available"]
+    assert await search(db_engine, category_name, FIRST_DAY, FIRST_DAY + timedelta(days=6)) == []
+    assert await search(db_engine, category_name, FIRST_DAY + timedelta(days=5), None) == []
+    with pytest.raises(exceptions.InvalidDateRange):
+        await search(db_engine, category_name, FIRST_DAY + timedelta(days=1), FIRST_DAY)
+
+
+async def test_days_are_stored_as_merged_ranges():
+    days = [FIRST_DAY + timedelta(days=i) for i in (6, 0, 1, 2, 3, 4)]
+    ranges = days_to_ranges(days)
+    assert [(r.lower, r.upper) for r in ranges] == [
+        (FIRST_DAY, FIRST_DAY + timedelta(days=5)),
+        (FIRST_DAY + timedelta(days=6), FIRST_DAY + timedelta(days=7))
+    ]
+    assert ranges_to_days(ranges) == sorted(days)
+    assert ranges_to_days(None) == []
@@ -0,0 +1,48 @@
+import pytest
+
+from src.admin import exceptions
+from src.admin import service as admin_service
+from src.admin.schemas import UpdateCategoryIn
+from src.advertisement.categories import CategoryTree
+from src.advertisement.types import CategoryId
+from tests.conftest import Factory, test_session_factory
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_category_ids_include_every_level_below():
+    rows = [
+        (CategoryId(1), "medical", None),
+        (CategoryId(2), "imaging", CategoryId(1)),
+        (CategoryId(3), "ultrasound", CategoryId(2)),
+        (CategoryId(4), "portable ultrasound", CategoryId(3)),
+        (CategoryId(5), "dental", None),
+    ]
+    tree = CategoryTree(version=1, rows=rows)
+
+    assert tree.category_ids("medical") == [1, 2, 3, 4]
+    assert tree.category_ids("ultrasound") == [3, 4]
+    assert tree.category_ids("dental") == [5]
+    assert tree.category_ids("unknown") == []
+
+
+async def test_parent_cycles_do_not_loop():
+    tree = CategoryTree(version=1, rows=[
+        (CategoryId(1), "first", CategoryId(2)),
+        (CategoryId(2), "second", CategoryId(1)),
+    ])
+
+    assert tree.category_ids("first") == [1, 2]
+
+
+async def test_category_cant_move_under_its_subcategory(factory: Factory):
+    parent = await factory.category()
+    child = await factory.category(parent_category=parent.id)
+    grandchild = await factory.category(parent_category=child.id)
+
+    async with test_session_factory() as session:
+        with pytest.raises(exceptions.InvalidParentCategoryName):
+            await admin_service.update_category_by_id(
+                session=session, category_id=parent.id,
+                payload=UpdateCategoryIn(name=parent.name, parentCategoryName=grandchild.name)
+            )
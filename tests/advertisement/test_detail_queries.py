@@ -0,0 +1,64 @@
+import time
+import pickle
+import pytest
+import sqlalchemy as sa
+
+from datetime import date, timedelta
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection
+
+from src.advertisement.models import Advertisement, AdvertisementImage, Category
+from src.advertisement.utils import image_urls_column, ranges_to_days
+from tests.conftest import Factory
+
+pytestmark = pytest.mark.asyncio
+
+IMAGES = 10
+DAYS = 90
+ROUNDS = 20
+
+
+async def fetch(conn: AsyncConnection, query: sa.Select) -> tuple[list, int, float]:
+    """
+    Rows of query, the size of their pickled payload and the
+    best time of ROUNDS runs, so a slow round doesn't count.
+    """
+    durations = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        rows = (await conn.execute(query)).all()
+        durations.append(time.perf_counter() - started)
+    return rows, len(pickle.dumps([tuple(row) for row in rows])), min(durations)
+
+
+async def test_detail_query_returns_one_row_per_advertisement(db_engine: AsyncEngine, factory: Factory):
+    advertisement = await factory.advertisement(
+        images=IMAGES, available_days=[Range(date.today(), date.today() + timedelta(days=DAYS))]
+    )
+    flat_query = sa.select(
+        Advertisement.id, Advertisement.title, AdvertisementImage.url,
+        Advertisement.available_days, Category.name.label("category_name")
+    ).select_from(Advertisement).join(
+        AdvertisementImage, Advertisement.id==AdvertisementImage.advertisement_id
+    ).join(
+        Category, Advertisement.category_id==Category.id
+    ).where(Advertisement.id==advertisement.id)
+    aggregated_query = sa.select(
+        Advertisement.id, Advertisement.title, Category.name.label("category_name"),
+        image_urls_column(), Advertisement.available_days
+    ).select_from(Advertisement).join(
+        Category, Advertisement.category_id==Category.id
+    ).where(Advertisement.id==advertisement.id)
+
+    async with db_engine.connect() as conn:
+        flat_rows, flat_payload, flat_duration = await fetch(conn, flat_query)
+        rows, payload, duration = await fetch(conn, aggregated_query)
+
+    assert len(flat_rows) == IMAGES
+    assert len(rows) == 1
+    assert rows[0].image_urls == [f"image-{i}.jpg" for i in range(IMAGES)]
+    days = ranges_to_days(rows[0].available_days)
+    assert len(days) == DAYS and days == sorted(days)
+    assert payload < flat_payload
+    # Loose bound, the aggregation shouldn't make the query slower than the join it replaced
+    assert duration < flat_duration * 1.5
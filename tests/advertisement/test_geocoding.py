@@ -0,0 +1,68 @@
+import json
+import pytest
+import threading
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from src.database import get_redis_connection
+from src.http_client import close_http_client
+from src.advertisement import exceptions
+from src.advertisement.config import advertisement_settings
+from src.advertisement.geocoding import geohash, reverse_geocode, address_cache_key
+
+
+class AddressApiStub(BaseHTTPRequestHandler):
+    requests = 0
+    status = 200
+
+    def do_GET(self):
+        AddressApiStub.requests += 1
+        self.send_response(AddressApiStub.status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps({"address": "Stub street 1"}).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def address_api(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), AddressApiStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        advertisement_settings, "ADDRESS_API_URL", f"http://127.0.0.1:{server.server_port}/reverse?"
+    )
+    AddressApiStub.requests, AddressApiStub.status = 0, 200
+    yield AddressApiStub
+    server.shutdown()
+
+
+def test_geohash():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+@pytest.mark.asyncio
+async def test_nearby_coordinates_share_cached_address(address_api):
+    redis = get_redis_connection()
+    await redis.delete(address_cache_key(32.65246, 51.67462))
+    try:
+        assert await reverse_geocode(redis=redis, lat=32.65246, lon=51.67462) == "Stub street 1"
+        assert await reverse_geocode(redis=redis, lat=32.65250, lon=51.67465) == "Stub street 1"
+        assert address_api.requests == 1
+    finally:
+        await close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_address_api_errors_are_not_cached(address_api):
+    redis = get_redis_connection()
+    await redis.delete(address_cache_key(35.7, 51.4))
+    address_api.status = 500
+    try:
+        with pytest.raises(exceptions.AddressApiException):
+            await reverse_geocode(redis=redis, lat=35.7, lon=51.4)
+        assert await redis.get(address_cache_key(35.7, 51.4)) is None
+    finally:
+        await close_http_client()
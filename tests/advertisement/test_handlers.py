@@ -0,0 +1,21 @@
+import pytest
+
+from uuid import uuid4
+
+from src.events import publish
+from src.database import get_redis_connection
+from src.advertisement import events
+from src.advertisement.service import MOST_VIEWED_ADS_KEY, RECENT_ADS_KEY
+from src.advertisement.types import AdvertisementId
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_moderation_events_invalidate_homepage_lists():
+    redis = get_redis_connection()
+    await redis.set(MOST_VIEWED_ADS_KEY, "{}")
+    await redis.set(RECENT_ADS_KEY, "{}")
+
+    await publish(events.AdvertisementUnpublished(AdvertisementId(uuid4())))
+
+    assert await redis.exists(MOST_VIEWED_ADS_KEY, RECENT_ADS_KEY) == 0
@@ -0,0 +1,20 @@
+import io
+
+from PIL import Image
+
+from src.advertisement.images import resize_image, variant_key
+
+
+def test_resize_image_encodes_webp_variants_without_upscaling():
+    buffer = io.BytesIO()
+    Image.new("RGB", (1000, 500), "white").save(buffer, format="JPEG")
+
+    variants = resize_image(buffer.getvalue(), [320, 1280], quality=80)
+
+    sizes = {width: Image.open(io.BytesIO(data)).size for width, data in variants.items()}
+    assert sizes == {320: (320, 160), 1280: (1000, 500)}
+    assert Image.open(io.BytesIO(variants[320])).format == "WEBP"
+
+
+def test_variant_key():
+    assert variant_key("6b1c.jpeg", 320) == "6b1c_320w.webp"
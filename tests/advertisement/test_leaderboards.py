@@ -0,0 +1,82 @@
+import pytest
+import sqlalchemy as sa
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.database import get_redis_connection
+from src.advertisement import service
+from src.advertisement.models import Advertisement
+from src.advertisement.views import record_view
+from src.advertisement.categories import bump_category_version
+from src.cache import invalidate
+from src.advertisement.leaderboards import (
+    sync_leaderboards, rebuild_leaderboards, move_category, category_leaderboard_key,
+    LEADERBOARD_KEY, LEADERBOARD_BUILT_KEY
+)
+from tests.conftest import Factory, test_session_factory
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_category_leaderboard_follows_views_and_moderation(db_engine: AsyncEngine, factory: Factory):
+    redis = get_redis_connection()
+    category = await factory.category()
+    first, second = await factory.advertisements(2, category=category, images=1)
+    await bump_category_version(redis)
+
+    for _ in range(3):
+        await record_view(redis=redis, advertisement_id=second.id, category_id=category.id)
+    await record_view(redis=redis, advertisement_id=first.id, category_id=category.id)
+    # Views which are not flushed yet survive a rebuild
+    await rebuild_leaderboards(redis=redis, session_factory=test_session_factory)
+
+    ads = await service.get_most_viewed_ads(
+        redis=redis, engine=db_engine, category_name=category.name, session_factory=test_session_factory
+    )
+    assert [(ad["id"], ad["views"]) for ad in ads] == [(str(second.id), 3), (str(first.id), 1)]
+
+    async with db_engine.begin() as conn:
+        await conn.execute(sa.update(Advertisement).where(Advertisement.id==second.id).values(published=False))
+    await sync_leaderboards(redis=redis, session_factory=test_session_factory, advertisement_ids=[second.id])
+    ads = await service.get_most_viewed_ads(
+        redis=redis, engine=db_engine, category_name=category.name, session_factory=test_session_factory
+    )
+    assert [ad["id"] for ad in ads] == [str(first.id)]
+
+
+async def test_category_change_moves_the_score(factory: Factory):
+    redis = get_redis_connection()
+    previous, category = await factory.categories(2)
+    advertisement = await factory.advertisement(category=previous)
+    await rebuild_leaderboards(redis=redis, session_factory=test_session_factory)
+    for _ in range(2):
+        await record_view(redis=redis, advertisement_id=advertisement.id, category_id=previous.id)
+
+    await move_category(
+        redis=redis, advertisement_id=advertisement.id, previous_category_id=previous.id, category_id=category.id
+    )
+    assert await redis.zscore(category_leaderboard_key(previous.id), str(advertisement.id)) is None
+    assert await redis.zscore(category_leaderboard_key(category.id), str(advertisement.id)) == 2
+
+
+async def test_most_viewed_ads_fall_back_to_stored_views_while_rebuilding(db_engine: AsyncEngine, factory: Factory):
+    redis = get_redis_connection()
+    category = await factory.category()
+    advertisement = await factory.advertisement(category=category, images=1, views=7)
+    await bump_category_version(redis)
+    await redis.delete(LEADERBOARD_BUILT_KEY)
+    await invalidate(redis, service.MOST_VIEWED_ADS_KEY)
+
+    # Another process is rebuilding the leaderboards
+    lock = redis.lock(name=f"{LEADERBOARD_KEY}:lock", timeout=10)
+    assert await lock.acquire(blocking=False)
+    try:
+        ads = await service.get_most_viewed_ads(
+            redis=redis, engine=db_engine, category_name=category.name, session_factory=test_session_factory
+        )
+        await service.get_most_viewed_ads(redis=redis, engine=db_engine, session_factory=test_session_factory)
+    finally:
+        await lock.release()
+
+    assert [(ad["id"], ad["views"]) for ad in ads] == [(str(advertisement.id), 7)]
+    assert await redis.get(service.MOST_VIEWED_ADS_KEY) is None
@@ -0,0 +1,25 @@
+import pytest
+
+from src.config import settings
+from src.database import get_redis_connection
+from src.advertisement.media import enqueue_orphan_media, collect_orphan_media, ORPHAN_MEDIA_KEY
+from src.s3.utils import get_s3_client, head_s3_object
+from tests.conftest import test_session_factory
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_collect_orphan_media_deletes_queued_keys(bucket):
+    redis = get_redis_connection()
+    await redis.delete(ORPHAN_MEDIA_KEY)
+    client = await get_s3_client()
+    keys = [f"orphan-{index}.png" for index in range(3)]
+    for key in keys:
+        await client.put_object(Bucket=settings.BUCKET_NAME, Key=key, Body=b"0")
+
+    await enqueue_orphan_media(redis=redis, keys=keys)
+    assert await collect_orphan_media(redis=redis, session_factory=test_session_factory) == 3
+
+    for key in keys:
+        assert await head_s3_object(key) is None
+    assert await redis.scard(ORPHAN_MEDIA_KEY) == 0
@@ -0,0 +1,45 @@
+import pytest
+
+from httpx import AsyncClient
+
+from src.database import get_redis_connection
+from src.auth.models import User
+from src.advertisement import exceptions
+from src.advertisement.schemas import PresignedUploadIn
+from src.advertisement.uploads import create_presigned_uploads, finalize_uploads
+from src.advertisement.config import advertisement_settings
+
+pytestmark = pytest.mark.asyncio
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + b"0" * 1024
+CONTENT_TYPE = advertisement_settings.ADVERTISEMENT_IMAGE_FORMATS.split(",")[0]
+
+
+async def upload(size: int) -> str:
+    redis = get_redis_connection()
+    user = User(id=1)
+    [presigned] = await create_presigned_uploads(
+        redis=redis, user=user, files=[PresignedUploadIn(content_type=CONTENT_TYPE, size=size)]
+    )
+    async with AsyncClient() as client:
+        r = await client.put(presigned["url"], content=IMAGE, headers={"Content-Type": CONTENT_TYPE})
+    assert r.status_code == 200
+    return presigned["key"]
+
+
+async def test_finalize_accepts_matching_upload(bucket):
+    key = await upload(size=len(IMAGE))
+    await finalize_uploads(redis=get_redis_connection(), user=User(id=1), image_keys=[key], video_key=None)
+
+
+async def test_finalize_rejects_other_users(bucket):
+    key = await upload(size=len(IMAGE))
+    with pytest.raises(exceptions.InvalidUpload):
+        await finalize_uploads(redis=get_redis_connection(), user=User(id=2), image_keys=[key], video_key=None)
+
+
+async def test_finalize_rejects_missing_object(bucket):
+    with pytest.raises(exceptions.InvalidUpload):
+        await finalize_uploads(
+            redis=get_redis_connection(), user=User(id=1), image_keys=["missing.png"], video_key=None
+        )
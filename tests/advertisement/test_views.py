@@ -0,0 +1,52 @@
+import pytest
+import sqlalchemy as sa
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.database import get_redis_connection
+from src.advertisement.models import Advertisement
+from src.advertisement.views import record_view, pending_views, flush_views, VIEWS_BUFFER_KEY, VIEWS_FLUSHING_KEY
+from tests.conftest import Factory, test_session_factory
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_flush_views_applies_buffered_views(db_engine: AsyncEngine, factory: Factory):
+    redis = get_redis_connection()
+    await redis.delete(VIEWS_BUFFER_KEY, VIEWS_FLUSHING_KEY)
+    advertisement = await factory.advertisement(views=5)
+
+    for _ in range(3):
+        await record_view(redis=redis, advertisement_id=advertisement.id, category_id=advertisement.category_id)
+    assert await pending_views(redis=redis) == {advertisement.id: 3}
+
+    assert await flush_views(redis=redis, session_factory=test_session_factory) == 1
+    assert await pending_views(redis=redis) == {}
+    assert await flush_views(redis=redis, session_factory=test_session_factory) == 0
+    async with db_engine.connect() as conn:
+        views = await conn.scalar(sa.select(Advertisement.views).where(Advertisement.id==advertisement.id))
+    assert views == 8
+
+
+async def test_views_of_failed_flush_are_applied_by_next_flush(db_engine: AsyncEngine, factory: Factory):
+    redis = get_redis_connection()
+    await redis.delete(VIEWS_BUFFER_KEY, VIEWS_FLUSHING_KEY)
+    advertisement = await factory.advertisement(views=5)
+    for _ in range(3):
+        await record_view(redis=redis, advertisement_id=advertisement.id, category_id=advertisement.category_id)
+
+    def failing_session_factory():
+        # Fails after the buffer is renamed and before the update
+        raise ConnectionError("database is down")
+
+    with pytest.raises(ConnectionError):
+        await flush_views(redis=redis, session_factory=failing_session_factory) # type: ignore
+    assert await redis.exists(VIEWS_FLUSHING_KEY)
+    await record_view(redis=redis, advertisement_id=advertisement.id, category_id=advertisement.category_id)
+    assert await pending_views(redis=redis) == {advertisement.id: 4}
+
+    assert await flush_views(redis=redis, session_factory=test_session_factory) == 2
+    assert await pending_views(redis=redis) == {}
+    async with db_engine.connect() as conn:
+        views = await conn.scalar(sa.select(Advertisement.views).where(Advertisement.id==advertisement.id))
+    assert views == 9
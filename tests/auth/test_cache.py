@@ -0,0 +1,55 @@
+import pytest
+
+from src.database import get_redis_connection
+from src.admin import service as admin_service
+from src.auth import exceptions
+from src.auth.cache import (
+    get_cached_user, cache_user, invalidate_user_state, user_state_generation, user_state_key
+)
+from src.auth.dependencies import get_current_active_user
+from tests.conftest import Factory, test_session_factory
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_cached_user_is_invalidated(factory: Factory):
+    redis = get_redis_connection()
+    user = await factory.user()
+    await redis.delete(user_state_key(user.id))
+
+    await cache_user(redis=redis, user=user, generation=await user_state_generation(redis=redis, user_id=user.id))
+    cached_user = await get_cached_user(redis=redis, user_id=user.id)
+    assert cached_user is not None
+    assert (cached_user.id, cached_user.phone_number, cached_user.is_banned) == (user.id, user.phone_number, False)
+
+    await invalidate_user_state(redis=redis, user_id=user.id)
+    assert await get_cached_user(redis=redis, user_id=user.id) is None
+
+
+async def test_user_loaded_before_invalidation_is_not_cached(factory: Factory):
+    redis = get_redis_connection()
+    user = await factory.user()
+    await redis.delete(user_state_key(user.id))
+
+    generation = await user_state_generation(redis=redis, user_id=user.id)
+    # The user changed while the request was loading it
+    await invalidate_user_state(redis=redis, user_id=user.id)
+    await cache_user(redis=redis, user=user, generation=generation)
+
+    assert await get_cached_user(redis=redis, user_id=user.id) is None
+
+
+async def test_banned_user_is_rejected_while_cached(factory: Factory):
+    redis = get_redis_connection()
+    user = await factory.user()
+    await redis.delete(user_state_key(user.id))
+
+    async with test_session_factory() as session:
+        assert (await get_current_active_user(data={"user_id": user.id}, session=session, redis=redis)).id == user.id
+    assert await get_cached_user(redis=redis, user_id=user.id) is not None
+
+    async with test_session_factory() as session:
+        await admin_service.ban_user(phone_number=user.phone_number, session=session, redis=redis)
+    async with test_session_factory() as session:
+        with pytest.raises(exceptions.UserIsBanned):
+            await get_current_active_user(data={"user_id": user.id}, session=session, redis=redis)
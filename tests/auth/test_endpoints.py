@@ -87,7 +87,7 @@ async def test_verify_account_with_invalid_verification_code(client: TestClient)
 
 async def test_verify_account_with_valid_verification_code(client: TestClient):
     r = get_redis_connection()
-    result_list: list[str] = r.keys(pattern="verification_code*") # type: ignore
+    result_list: list[str] = await r.keys(pattern="verification_code*") # type: ignore
     payload = {
         "verificationCode": result_list[0].split(":")[1]
     }
@@ -172,7 +172,7 @@ async def test_verify_reset_password_with_invalid_data(client: TestClient):
 
 async def test_verify_reset_password_with_valid_data_successfully(client: TestClient):
     r = get_redis_connection()
-    result_list: list[str] = r.keys(pattern="reset_password*") # type: ignore
+    result_list: list[str] = await r.keys(pattern="reset_password*") # type: ignore
     payload = {
         "randomPassword": result_list[0].split(":")[1]
     }
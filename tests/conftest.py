@@ -1,31 +1,38 @@
 import pytest
 import pytest_asyncio
 import asyncio
+import itertools
 import sqlalchemy as sa
 
 from functools import lru_cache
-from typing import AsyncGenerator, Final, Generator
+from typing import Any, AsyncGenerator, Final, Generator
 from httpx import AsyncClient, ASGITransport
 from async_asgi_testclient import TestClient # type: ignore
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 
-from src.database import Base, get_session, get_engine
+from src.database import Base, get_session, get_engine, get_redis_connection
+from src.rate_limit import RATE_LIMIT_KEY_PREFIX
 from src.config import settings
 from src.main import app
 from src.auth.utils import get_password_hash
 from src.auth.models import User
 from src.auth.types import Password
+from src.advertisement.models import Advertisement, AdvertisementImage, Category
 
 TEST_DB_URL: Final[str] = str(settings.POSTGRES_TEST_URL)
 test_engine = create_async_engine(TEST_DB_URL)
+test_session_factory = async_sessionmaker(test_engine, expire_on_commit=False)
+# Numbers for unique phone numbers and category names across the session
+_sequence = itertools.count(1)
 
 
 @lru_cache
 def override_get_engine() -> AsyncEngine:
     return test_engine
 
-def override_get_session() -> async_sessionmaker[AsyncSession]:
-    return async_sessionmaker(test_engine, expire_on_commit=False)
+async def override_get_session() -> AsyncGenerator[AsyncSession, None]:
+    async with test_session_factory() as session:
+        yield session
 
 app.dependency_overrides[get_session] = override_get_session
 app.dependency_overrides[get_engine] = override_get_engine
@@ -54,7 +61,7 @@ async def _database_objects(db_engine: AsyncEngine):
 
 @pytest_asyncio.fixture(scope="session", autouse=True)
 async def create_admin_user(db_engine: AsyncEngine):
-    hashed_password = get_password_hash(Password("mM@123456"))
+    hashed_password = await get_password_hash(Password("mM@123456"))
     query = sa.insert(User).values({
         User.phone_number: "09132222222",
         User.password: hashed_password,
@@ -65,6 +72,14 @@ async def create_admin_user(db_engine: AsyncEngine):
         await transaction.execute(query)
 
 
+@pytest_asyncio.fixture(autouse=True)
+async def _reset_rate_limits() -> None:
+    redis = get_redis_connection()
+    keys = [key async for key in redis.scan_iter(match=f"{RATE_LIMIT_KEY_PREFIX}:*")]
+    if keys:
+        await redis.delete(*keys)
+
+
 @pytest.fixture(scope="session")
 def event_loop() -> Generator:
     loop = asyncio.get_event_loop_policy().new_event_loop()
@@ -75,4 +90,86 @@ def event_loop() -> Generator:
 @pytest_asyncio.fixture
 async def client() -> AsyncGenerator[TestClient, None]:
     async with AsyncClient(transport=ASGITransport(app=app, client=("127.0.0.1", "8000")), base_url="http://test") as client: # type: ignore
-        yield client
\ No newline at end of file
+        yield client
+
+
+class Factory:
+    """
+    Creates users, categories and advertisements through the models,
+    cleanup deletes everything created by this factory.
+    """
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        self.session_factory = session_factory
+        self.objects: list[Any] = []
+
+    async def _add(self, objects: list[Any]) -> list[Any]:
+        async with self.session_factory() as session:
+            async with session.begin():
+                session.add_all(objects)
+        self.objects.extend(objects)
+        return objects
+
+    async def user(self, **values: Any) -> User:
+        values = {
+            "phone_number": f"0999{next(_sequence):07d}", "password": "password", "is_active": True, **values
+        }
+        [user] = await self._add([User(**values)])
+        return user
+
+    async def categories(self, count: int = 1, **values: Any) -> list[Category]:
+        return await self._add([
+            Category(**{"name": f"category {next(_sequence)}", **values}) for _ in range(count)
+        ])
+
+    async def category(self, **values: Any) -> Category:
+        [category] = await self.categories(**values)
+        return category
+
+    async def advertisements(
+            self, count: int = 1, *, user: User | None = None, category: Category | None = None,
+            images: int = 0, **values: Any
+    ) -> list[Advertisement]:
+        """
+        Published advertisements with images named image-{position}.jpg,
+        of a new user and category unless they are passed.
+        """
+        user = user or await self.user()
+        category = category or await self.category()
+        advertisements = await self._add([
+            Advertisement(**{
+                "title": f"title {index}", "description": "description", "place": f"place {index}",
+                "published": True, "user_id": user.id, "category_id": category.id, **values
+            })
+            for index in range(count)
+        ])
+        if images:
+            await self._add([
+                AdvertisementImage(url=f"image-{position}.jpg", position=position, advertisement_id=advertisement.id)
+                for advertisement in advertisements for position in range(images)
+            ])
+        return advertisements
+
+    async def advertisement(self, **values: Any) -> Advertisement:
+        [advertisement] = await self.advertisements(**values)
+        return advertisement
+
+    async def cleanup(self) -> None:
+        """
+        Deleting users and categories removes their advertisements and images too.
+        """
+        async with self.session_factory() as session:
+            async with session.begin():
+                for model in (User, Category):
+                    ids = [obj.id for obj in self.objects if isinstance(obj, model)]
+                    if ids:
+                        await session.execute(sa.delete(model).where(model.id.in_(ids)))
+        self.objects.clear()
+
+
+@pytest_asyncio.fixture
+async def factory() -> AsyncGenerator[Factory, None]:
+    factory = Factory(test_session_factory)
+    try:
+        yield factory
+    finally:
+        await factory.cleanup()
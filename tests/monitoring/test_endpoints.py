@@ -0,0 +1,22 @@
+import pytest
+
+from fastapi import status
+from async_asgi_testclient import TestClient # type: ignore
+
+from tests.auth.test_endpoints import test_admin_login_successfully
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_metrics_require_admin(client: TestClient):
+    response = await client.get("/metrics/")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_metrics_for_admin(client: TestClient):
+    access_token = await test_admin_login_successfully(client=client)
+    response = await client.get("/metrics/", headers={"Authorization": f"Bearer {access_token}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "password_hashing_" in response.text
@@ -0,0 +1,103 @@
+import time
+import asyncio
+import orjson
+import pytest
+
+from src.cache import get_or_load, invalidate, Uncached
+from src.database import get_redis_connection
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_concurrent_misses_load_once():
+    redis = get_redis_connection()
+    await redis.delete("test-cache:miss")
+    calls = 0
+
+    async def loader() -> list[int]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.2)
+        return [1, 2, 3]
+
+    try:
+        results = await asyncio.gather(*[
+            get_or_load(redis=redis, key="test-cache:miss", loader=loader, ttl=60) for _ in range(10)
+        ])
+    finally:
+        await redis.delete("test-cache:miss")
+
+    assert calls == 1
+    assert results == [[1, 2, 3]] * 10
+
+
+async def test_expired_entry_is_served_while_refreshing():
+    redis = get_redis_connection()
+    expired = {"value": "stale", "delta": 0.1, "expires_at": time.time() - 1}
+    await redis.set(name="test-cache:stale", value=orjson.dumps(expired), ex=60)
+
+    async def loader() -> str:
+        await asyncio.sleep(0.1)
+        return "fresh"
+
+    try:
+        assert await get_or_load(redis=redis, key="test-cache:stale", loader=loader, ttl=60) == "stale"
+        assert await get_or_load(redis=redis, key="test-cache:stale", loader=loader, ttl=60) == "stale"
+        await asyncio.sleep(0.3)
+        assert await get_or_load(redis=redis, key="test-cache:stale", loader=loader, ttl=60) == "fresh"
+    finally:
+        await redis.delete("test-cache:stale")
+
+
+async def test_load_started_before_invalidation_is_not_stored():
+    redis = get_redis_connection()
+
+    async def loader() -> str:
+        await invalidate(redis, "test-cache:invalidated")
+        return "outdated"
+
+    try:
+        assert await get_or_load(redis=redis, key="test-cache:invalidated", loader=loader, ttl=60) == "outdated"
+        assert await redis.get("test-cache:invalidated") is None
+    finally:
+        await redis.delete("test-cache:invalidated", "test-cache:invalidated:generation")
+
+
+async def test_waiter_takes_over_when_the_lock_holder_fails():
+    redis = get_redis_connection()
+    await redis.delete("test-cache:failed")
+    calls = 0
+
+    async def loader() -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.1)
+        if calls == 1:
+            raise RuntimeError("loader failed")
+        return "loaded"
+
+    start = time.monotonic()
+    try:
+        results = await asyncio.gather(*[
+            get_or_load(redis=redis, key="test-cache:failed", loader=loader, ttl=60) for _ in range(5)
+        ], return_exceptions=True)
+    finally:
+        await redis.delete("test-cache:failed")
+
+    assert len([result for result in results if isinstance(result, RuntimeError)]) == 1
+    assert [result for result in results if result == "loaded"] == ["loaded"] * 4
+    assert calls == 2
+    assert time.monotonic() - start < 1
+
+
+async def test_uncached_values_are_served_but_not_stored():
+    redis = get_redis_connection()
+
+    async def loader() -> Uncached:
+        return Uncached("fallback")
+
+    try:
+        assert await get_or_load(redis=redis, key="test-cache:uncached", loader=loader, ttl=60) == "fallback"
+        assert await redis.get("test-cache:uncached") is None
+    finally:
+        await redis.delete("test-cache:uncached")
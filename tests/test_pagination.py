@@ -0,0 +1,41 @@
+import pytest
+
+from src.pagination import (
+    CountStrategy, InvalidCursor, decode_cursor, encode_cursor, pagination_query
+)
+from src.advertisement.models import Advertisement
+
+pytestmark = pytest.mark.asyncio
+
+COLUMNS = [Advertisement.created_at, Advertisement.id]
+
+
+async def test_cursor_round_trip():
+    cursor = encode_cursor(["2030-01-10T10:00:00+00:00", "6b1c7a52-3c1f-4a7e-9d55-7a0e0a8a1f10"])
+    created_at, advertisement_id = decode_cursor(cursor, COLUMNS)
+    assert created_at.year == 2030
+    assert str(advertisement_id) == "6b1c7a52-3c1f-4a7e-9d55-7a0e0a8a1f10"
+
+
+@pytest.mark.parametrize(
+        "values",
+        [
+            [1234, "6b1c7a52-3c1f-4a7e-9d55-7a0e0a8a1f10"],
+            ["2030-01-10T10:00:00+00:00", ["6b1c7a52"]],
+            ["2030-01-10T10:00:00+00:00", {"id": 1}],
+            ["2030-01-10T10:00:00+00:00"],
+        ]
+)
+async def test_wrong_typed_cursor_is_rejected(values):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(values), COLUMNS)
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not a cursor", COLUMNS)
+
+
+async def test_cursor_pages_skip_the_count_by_default():
+    assert (await pagination_query(cursor=None)).count_strategy is CountStrategy.EXACT
+    assert (await pagination_query(cursor="cursor")).count_strategy is CountStrategy.NONE
+    assert (await pagination_query(cursor="cursor", count_strategy=CountStrategy.CACHED)).count_strategy is (
+        CountStrategy.CACHED
+    )
@@ -0,0 +1,96 @@
+import json
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+
+from datetime import date
+from typing import AsyncGenerator
+from sqlalchemy.dialects.postgresql import Range, array
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.database import Explain
+from src.advertisement.models import Advertisement, Category
+from src.advertisement.utils import location_column, earth_point
+from src.tickets.models import Ticket
+from tests.conftest import Factory, test_session_factory
+
+pytestmark = pytest.mark.asyncio
+
+SEED_ROWS = 5000
+
+
+@pytest_asyncio.fixture(scope="module")
+async def seeded(db_engine: AsyncEngine) -> AsyncGenerator[None, None]:
+    factory = Factory(test_session_factory)
+    tickets = [
+        Ticket(name=f"name {index}", email=f"{index}@example.com", message="message") for index in range(SEED_ROWS)
+    ]
+    try:
+        [category, *_] = await factory.categories(SEED_ROWS)
+        await factory.advertisements(SEED_ROWS, category=category)
+        # Spread advertisements over the map and the coming year, so the statistics
+        # look like real data rather than one point with no available days
+        starts = sa.func.current_date() + sa.func.abs(sa.func.hashtext(sa.cast(Advertisement.id, sa.Text)) % 365)
+        async with db_engine.begin() as conn:
+            await conn.execute(
+                sa.update(Advertisement).where(Advertisement.category_id==category.id).values(
+                    lat_lon=array([25 + sa.func.random() * 15, 44 + sa.func.random() * 19]),
+                    available_days=sa.func.datemultirange(sa.func.daterange(starts, starts + 7))
+                )
+            )
+        async with test_session_factory() as session:
+            async with session.begin():
+                session.add_all(tickets)
+        async with db_engine.begin() as conn:
+            for table in ("users", "categories", "advertisements", "tickets"):
+                await conn.execute(sa.text(f"ANALYZE {table}"))
+        yield
+    finally:
+        await factory.cleanup()
+        async with db_engine.begin() as conn:
+            await conn.execute(sa.delete(Ticket).where(Ticket.id.in_([ticket.id for ticket in tickets])))
+
+
+@pytest.mark.parametrize(
+        "query, index_name",
+        [
+            (
+                sa.select(Advertisement.id).where(Advertisement.place.ilike("%abc%")),
+                "ix_advertisements_place_trgm"
+            ),
+            (
+                sa.select(Advertisement.id).where(
+                    sa.func.earth_box(earth_point(32.6, 51.6), sa.literal(5000, sa.Float)).bool_op("@>")(
+                        location_column()
+                    )
+                ),
+                "ix_advertisements_location"
+            ),
+            (
+                sa.select(Advertisement.id).where(
+                    Advertisement.available_days.contains([Range(date(2030, 1, 10), date(2030, 1, 15))])
+                ),
+                "ix_advertisements_available_days"
+            ),
+            (
+                sa.select(Category.name).where(Category.name.ilike("%abc%")),
+                "ix_categories_name_trgm"
+            ),
+            (
+                sa.select(Ticket.email, Ticket.name, Ticket.message).where(Ticket.name.ilike("%abc%")),
+                "ix_tickets_name_trgm"
+            ),
+            (
+                sa.select(Ticket.email, Ticket.name, Ticket.message).where(Ticket.email.ilike("%abc%")),
+                "ix_tickets_email_trgm"
+            ),
+        ]
+)
+async def test_filters_use_indexes(db_engine: AsyncEngine, seeded, query, index_name):
+    # Sequential scans are left enabled, the planner has to prefer the index on the analyzed tables
+    async with db_engine.connect() as conn:
+        plan = (await conn.execute(Explain(query))).scalar()
+
+    if not isinstance(plan, str):
+        plan = json.dumps(plan)
+    assert f'"Index Name": "{index_name}"' in plan
@@ -0,0 +1,41 @@
+import pytest
+
+from fastapi import status
+from async_asgi_testclient import TestClient # type: ignore
+
+from src.config import settings
+from src.database import get_redis_connection
+from src.rate_limit import RateLimit, hit, limit_by_ip
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_every_window_must_allow_the_request():
+    redis = get_redis_connection()
+    limits = [RateLimit(2, 60), RateLimit(3, 3600)]
+
+    assert await hit(redis=redis, scope="test", identifier="client", limits=limits) == 0
+    assert await hit(redis=redis, scope="test", identifier="client", limits=limits) == 0
+    retry_after = await hit(redis=redis, scope="test", identifier="client", limits=limits)
+    assert 0 < retry_after <= 60
+    # Rejected requests are not recorded in the longer window either
+    assert await redis.zcard("rate-limit:test:client:3600") == 2
+    assert await hit(redis=redis, scope="test", identifier="other", limits=limits) == 0
+
+
+async def test_limits_below_one_are_rejected():
+    with pytest.raises(ValueError):
+        limit_by_ip("test", RateLimit(0, 60))
+    with pytest.raises(ValueError):
+        limit_by_ip("test", RateLimit(5, 0))
+
+
+async def test_create_ticket_is_rate_limited(client: TestClient):
+    payload = {"name": "Ali", "email": "ali@gmail.com", "message": "Rate limited"}
+    for _ in range(settings.CREATE_TICKET_REQUESTS_PER_HOUR):
+        response = await client.post("/tickets/create-ticket/", json=payload)
+        assert response.status_code == status.HTTP_201_CREATED
+
+    response = await client.post("/tickets/create-ticket/", json=payload)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert 0 < int(response.headers["Retry-After"]) <= 3600